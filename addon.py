@@ -2,15 +2,20 @@ import sys
 from urllib.parse import parse_qsl
 import xbmc
 import xbmcgui
+from resources.lib.artwork import prefetch_artwork
 from resources.lib.auth import test_session
 from resources.lib.cache import clear_cache
-from resources.lib.constants import _HANDLE, _ADDON
+from resources.lib.constants import _HANDLE
+from resources.lib.metrics import begin, finish, span
 from resources.lib.menu import list_menu, list_videos, list_popular, list_top, list_continue, list_creators, list_archive
+from resources.lib.prefetch import get_navigation_check, prefetch_next_page, store_pages
 from resources.lib.search import search, list_search_results
+from resources.lib.searchindex import flush_videos
+from resources.lib.settings import get_settings
 from resources.lib.talknews import list_talknews, show_article, show_news_info
 from resources.lib.utils import log, get_ip
 from resources.lib.video import play_video, select_quality, skip_yt_part, yt_live, yt_vip_stream, resume_from_web
-from resources.lib.monitor import start_monitor, reset_monitor
+from resources.lib.monitor import reset_monitor
 
 def router(paramstring):
     """
@@ -24,6 +29,7 @@ def router(paramstring):
         # Parse the query parameters from the URL
         params = dict(parse_qsl(paramstring[1:]))
         log(f"Router received params: {params}", xbmc.LOGINFO)
+        begin(params.get('action', 'menu'))
 
         if not params:
             # If no parameters, list the main menu
@@ -164,6 +170,21 @@ def router(paramstring):
         log(f"Error in router: {str(e)}", xbmc.LOGERROR)
         xbmcgui.Dialog().notification('Chyba', 'Chyba při zpracování požadavku')
 
+    finally:
+        # Store metadata of all videos seen during this invocation for offline search
+        with span('step', 'flush_videos'):
+            flush_videos()
+        # The directory is already shown, keep the pages for outages and get the next
+        # page and the thumbnails ready unless the user moves on to another folder
+        with span('step', 'store_pages'):
+            store_pages()
+        navigated_away = get_navigation_check()
+        with span('step', 'prefetch_next_page'):
+            prefetch_next_page(navigated_away)
+        with span('step', 'prefetch_artwork'):
+            prefetch_artwork(navigated_away)
+        finish()
+
 if __name__ == '__main__':
     """
     Entry point for the addon, route the request based on the parameters
@@ -178,7 +199,7 @@ if __name__ == '__main__':
     """
 
     # Only import and start web server if enabled
-    if _ADDON.getSetting('enable_config_page') == 'true':
+    if get_settings().enable_config_page:
         try:
             import threading
             from resources.lib.webconfig import start_server
@@ -190,11 +211,5 @@ if __name__ == '__main__':
         except Exception as e:
             log(f"Failed to start config web server: {str(e)}", xbmc.LOGERROR)
 
-    # Start TALKNEWS monitor if enabled
-    try:
-        start_monitor()
-    except Exception as e:
-        log(f"Failed to start TALKNEWS monitor: {str(e)}", xbmc.LOGERROR)
-
     # Route the request based on the parameters
     router(sys.argv[2])
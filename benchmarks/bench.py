@@ -0,0 +1,350 @@
+"""
+Offline benchmark of the addon's scraping hot paths.
+
+Runs the addon against Kodi module stubs (benchmarks/kodi_stubs) and a local
+HTTP stand-in for talktv.cz serving fixtures (benchmarks/fixtures.py), and
+reports wall time, time to the first directory item and to the end of the
+directory (background work like prefetching runs after it), request count, bytes,
+parse time and the peak resident memory above the start of the run per action.
+RSS is coarse (thread stacks, allocator arenas kept from earlier runs);
+--trace-memory also reports the peak of the Python heap, at a cost in speed. --latency-ms delays every response like a real
+network round trip would.
+
+Every run re-imports the addon in a fresh profile directory, like a plugin
+invocation in Kodi. "cold" runs start with an empty profile, "warm" runs reuse
+the profile of a previous run (detail cache filled). For list_videos_page_next
+the previous run is list_videos_page, the page before it, so the warm run shows
+what the next-page prefetch saves when paging forward.
+
+Usage:
+    python benchmarks/bench.py [--repeat N] [--latency-ms MS] [--json] [--trace-memory] [action ...]
+"""
+
+import argparse
+import gc
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+_BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.dirname(_BENCH_DIR)
+sys.path.insert(0, os.path.join(_BENCH_DIR, 'kodi_stubs'))
+sys.path.insert(0, _BENCH_DIR)
+sys.path.insert(0, _ROOT)
+
+import bs4
+import requests
+import xbmc
+import xbmcaddon
+import xbmcplugin
+import fixtures
+
+class _Stats:
+    """Counters of the current measurement"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.bytes = 0
+        self.parse_time = 0.0
+
+    def add_request(self, size):
+        with self.lock:
+            self.requests += 1
+            self.bytes += size
+
+    def add_parse(self, elapsed):
+        with self.lock:
+            self.parse_time += elapsed
+
+stats = _Stats()
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    # Simulated network round trip (seconds)
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        parts = urlsplit(self.path)
+        status, content_type, body = fixtures.render(parts.path, parse_qs(parts.query))
+        stats.add_request(len(body))
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class _FixtureAdapter(requests.adapters.HTTPAdapter):
+    """Sends talktv.cz requests to the local fixture server instead"""
+
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        original_url = request.url
+        parts = urlsplit(original_url)
+        request.url = self.base_url + parts.path + (f'?{parts.query}' if parts.query else '')
+        response = super().send(request, **kwargs)
+        # The addon only ever sees talktv.cz URLs
+        request.url = response.url = original_url
+        return response
+
+def _install_transport(base_url):
+    # Every session created by the addon talks to the fixture server
+    original_init = requests.Session.__init__
+
+    def init(session, *args, **kwargs):
+        original_init(session, *args, **kwargs)
+        adapter = _FixtureAdapter(base_url)
+        session.mount('https://www.talktv.cz', adapter)
+        session.mount('https://static.talktv.cz', adapter)
+
+    requests.Session.__init__ = init
+
+def _install_parse_timer():
+    # Time spent building soups, wherever the addon creates them
+    original_init = bs4.BeautifulSoup.__init__
+
+    def init(soup, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            original_init(soup, *args, **kwargs)
+        finally:
+            stats.add_parse(time.perf_counter() - start)
+
+    bs4.BeautifulSoup.__init__ = init
+
+def _fresh_import():
+    # Drop the addon modules so each run imports them like a new plugin invocation
+    for name in list(sys.modules):
+        if name == 'resources' or name.startswith('resources.'):
+            del sys.modules[name]
+    sys.argv = ['plugin://plugin.video.talk.cz/', '1', '']
+
+def _video_url(index):
+    return f'https://www.talktv.cz/video/{fixtures.video_slug(index)}'
+
+def _first_media_item():
+    from bs4 import BeautifulSoup
+    _, html = fixtures.listing_page(0)
+    return BeautifulSoup(html, 'html.parser').find('a', class_='media')
+
+def _action_list_menu():
+    from resources.lib.menu import list_menu
+    list_menu()
+
+def _action_list_videos():
+    from resources.lib.menu import list_videos
+    list_videos('https://www.talktv.cz/videa')
+
+def _action_list_videos_page():
+    from resources.lib.menu import list_videos
+    list_videos('https://www.talktv.cz/videa?page=3')
+
+def _action_list_videos_page_next():
+    from resources.lib.menu import list_videos
+    list_videos('https://www.talktv.cz/videa?page=4')
+
+def _action_list_archive():
+    from resources.lib.menu import list_videos
+    list_videos('https://www.talktv.cz/seznam-videi/irl-prochazky-z-terenu')
+
+def _action_list_popular():
+    from resources.lib.menu import list_popular
+    list_popular(1)
+
+def _action_list_continue():
+    from resources.lib.menu import list_continue
+    list_continue()
+
+def _action_process_video_item():
+    from resources.lib.auth import get_session
+    from resources.lib.menu import process_video_item
+    process_video_item(_first_media_item(), get_session())
+
+def _action_get_video_details():
+    from resources.lib.auth import get_session
+    from resources.lib.cache import get_video_details
+    get_video_details(get_session(), _video_url(7))
+
+def _action_play_video():
+    from resources.lib.video import play_video
+    play_video(_video_url(7))
+
+def _action_list_talknews():
+    from resources.lib.talknews import list_talknews
+    list_talknews()
+
+def _action_search():
+    from resources.lib.search import list_search_results
+    list_search_results('https://www.talktv.cz/hledani?q=rozhovor')
+
+ACTIONS = {
+    'list_menu': _action_list_menu,
+    'list_videos': _action_list_videos,
+    'list_videos_page': _action_list_videos_page,
+    'list_videos_page_next': _action_list_videos_page_next,
+    'list_archive': _action_list_archive,
+    'list_popular': _action_list_popular,
+    'list_continue': _action_list_continue,
+    'process_video_item': _action_process_video_item,
+    'get_video_details': _action_get_video_details,
+    'play_video': _action_play_video,
+    'list_talknews': _action_list_talknews,
+    'search': _action_search,
+}
+
+# Actions whose warm run follows a different action
+_PREVIOUS = {
+    'list_videos_page_next': 'list_videos_page',
+}
+
+def _reset_peak_rss():
+    # Linux resets the VmHWM high-water mark to the current RSS on request
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def _read_rss_kib(field):
+    # VmRSS (current) or VmHWM (peak) of this process, 0 where /proc is not available
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def _run_once(action, profile):
+    xbmcaddon.info['profile'] = profile
+    xbmcplugin.reset()
+    _fresh_import()
+    gc.collect()
+    _reset_peak_rss()
+    rss_start = _read_rss_kib('VmRSS')
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        heap_start = tracemalloc.get_traced_memory()[0]
+
+    start = time.perf_counter()
+    from resources.lib import utils  # noqa: F401 - import cost is part of every invocation
+    imported = time.perf_counter()
+
+    stats.reset()
+    ACTIONS[action]()
+    # Same steps as the end of addon.router, after the directory was handed to Kodi
+    from resources.lib.searchindex import flush_videos
+    from resources.lib.artwork import prefetch_artwork
+    from resources.lib.prefetch import prefetch_next_page, store_pages
+    flush_videos()
+    store_pages()
+    prefetch_next_page()
+    prefetch_artwork()
+    end = time.perf_counter()
+
+    first_item = xbmcplugin.first_item_at
+    ended = xbmcplugin.ended_at
+    return {
+        'wall_ms': (end - start) * 1000,
+        'first_item_ms': (first_item - start) * 1000 if first_item else 0.0,
+        'listed_ms': (ended - start) * 1000 if ended else 0.0,
+        'import_ms': (imported - start) * 1000,
+        'requests': stats.requests,
+        'bytes': stats.bytes,
+        'parse_ms': stats.parse_time * 1000,
+        'items': len(xbmcplugin.items),
+        'peak_rss_kib': max(_read_rss_kib('VmHWM') - rss_start, 0),
+        'peak_heap_kib': (tracemalloc.get_traced_memory()[1] - heap_start) / 1024 if tracemalloc.is_tracing() else 0,
+    }
+
+def measure(action, mode, repeat):
+    """
+    Measure an action.
+
+    Args:
+        action (str): Name from ACTIONS
+        mode (str): 'cold' (empty profile) or 'warm' (profile of a previous run)
+        repeat (int): Number of measured runs
+
+    Returns:
+        dict: Median of each metric
+    """
+
+    runs = []
+    for _ in range(repeat):
+        profile = tempfile.mkdtemp(prefix='talk-bench-')
+        try:
+            if mode == 'warm':
+                _run_once(_PREVIOUS.get(action, action), profile)
+            runs.append(_run_once(action, profile))
+        finally:
+            shutil.rmtree(profile, ignore_errors=True)
+
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark of the TALK addon hot paths')
+    parser.add_argument('actions', nargs='*', help=f"actions to run (default: all): {', '.join(ACTIONS)}")
+    parser.add_argument('--repeat', type=int, default=5, help='measured runs per action (median is reported)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='simulated network latency per request')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--trace-memory', action='store_true', help='report the peak of the Python heap (slower)')
+    args = parser.parse_args()
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    actions = args.actions or list(ACTIONS)
+    unknown = [action for action in actions if action not in ACTIONS]
+    if unknown:
+        parser.error(f"unknown actions: {', '.join(unknown)}")
+
+    _FixtureHandler.latency = args.latency_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _install_transport(f'http://127.0.0.1:{server.server_address[1]}')
+    _install_parse_timer()
+    xbmcaddon.settings['session_cookie'] = 'benchmark'
+
+    results = []
+    for action in actions:
+        for mode in ('cold', 'warm'):
+            result = measure(action, mode, args.repeat)
+            result.update(action=action, mode=mode)
+            results.append(result)
+            if not args.json:
+                print(f"{action:<21} {mode:<5} {result['wall_ms']:9.1f} ms  first {result['first_item_ms']:8.1f} ms"
+                      f"  listed {result['listed_ms']:8.1f} ms"
+                      f"  {result['requests']:4.0f} req"
+                      f"  {result['bytes'] / 1024:8.1f} KiB  parse {result['parse_ms']:8.1f} ms"
+                      f"  import {result['import_ms']:6.1f} ms  {result['items']:3.0f} items"
+                      f"  peak +{result['peak_rss_kib'] / 1024:5.1f} MiB"
+                      + (f" (heap {result['peak_heap_kib'] / 1024:5.1f} MiB)" if args.trace_memory else ''), flush=True)
+
+    server.shutdown()
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
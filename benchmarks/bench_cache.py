@@ -0,0 +1,91 @@
+"""
+Micro-benchmark of the on-disk caches: file size, load and save time of the
+video details cache for a growing number of entries, in the pretty-printed
+JSON format of older versions and in the current minified JSON format with
+compressed texts. Also checks that a legacy file migrates.
+
+Usage:
+    python benchmarks/bench_cache.py [--entries N [N ...]]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+_BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(_BENCH_DIR, 'kodi_stubs'))
+sys.path.insert(0, os.path.dirname(_BENCH_DIR))
+_ARGS = sys.argv[1:]
+sys.argv = ['plugin://plugin.video.talk.cz/', '1', '']
+
+import xbmcaddon
+
+def _legacy_entries(count):
+    description = ' '.join(['Rozhovor o technologiích, politice a společnosti.'] * 30)
+    return {
+        f'https://www.talktv.cz/video/video-{i}-host-a-tema-dilu-{i:08x}': {
+            'description': f'{description} {i}',
+            'date': f'{1 + i % 28}. června 2024',
+            'timestamp': time.time()
+        }
+        for i in range(count)
+    }
+
+def _best(function, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark of the on-disk caches')
+    parser.add_argument('--entries', type=int, nargs='+', default=[500, 2000, 8000], help='cache sizes to measure')
+    args = parser.parse_args(_ARGS)
+
+    profile = tempfile.mkdtemp(prefix='talk-bench-cache-')
+    xbmcaddon.info['profile'] = profile
+    from resources.lib import cache
+
+    print(f"{'entries':>8} {'format':<14} {'size':>10} {'load':>10} {'save':>10} {'lookup 25':>10}")
+    try:
+        for count in args.entries:
+            legacy = _legacy_entries(count)
+            legacy_path = os.path.join(profile, 'video_cache.json')
+
+            def save_legacy():
+                with open(legacy_path, 'w', encoding='utf-8') as f:
+                    json.dump(legacy, f, ensure_ascii=False, indent=2)
+
+            def load_legacy():
+                with open(legacy_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+
+            save_ms = _best(save_legacy)
+            load_ms = _best(load_legacy)
+            print(f"{count:>8} {'legacy json':<14} {os.path.getsize(legacy_path) / 1024:7.0f} KiB"
+                  f" {load_ms:7.1f} ms {save_ms:7.1f} ms", flush=True)
+
+            # The first load migrates the legacy file
+            migrated = cache.load_cache(cache.VIDEO_CACHE)
+            assert len(migrated) == count and not os.path.exists(legacy_path)
+
+            urls = list(legacy)[:25]
+            save_ms = _best(lambda: cache.save_cache(migrated, cache.VIDEO_CACHE))
+            load_ms = _best(lambda: cache.load_cache(cache.VIDEO_CACHE))
+            lookup_ms = _best(lambda: cache.get_cached_video_details(urls))
+            assert cache.get_cached_video_details(urls[:1])[urls[0]][0] == legacy[urls[0]]['description']
+            print(f"{count:>8} {'json v2':<14} {os.path.getsize(cache.get_cache_path()) / 1024:7.0f} KiB"
+                  f" {load_ms:7.1f} ms {save_ms:7.1f} ms {lookup_ms:7.1f} ms", flush=True)
+            os.remove(cache.get_cache_path())
+    finally:
+        shutil.rmtree(profile, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Micro-benchmark of utils.log: per-call cost at each level, with debug logging
+disabled and enabled, for eager f-strings and lazily formatted messages.
+
+The previous implementation (settings read and frame inspection on every
+call) is included as a baseline. The Kodi stubs answer getSetting from a
+dict, so the baseline understates its cost inside Kodi; --setting-cost-us
+adds a simulated delay to each settings read.
+
+Usage:
+    python benchmarks/bench_log.py [--calls N] [--setting-cost-us US]
+"""
+
+import argparse
+import os
+import sys
+import time
+import traceback
+import timeit
+
+_BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(_BENCH_DIR, 'kodi_stubs'))
+sys.path.insert(0, os.path.dirname(_BENCH_DIR))
+_ARGS = sys.argv[1:]
+sys.argv = ['plugin://plugin.video.talk.cz/', '1', '']
+
+import xbmc
+import xbmcaddon
+from resources.lib import settings, utils
+from resources.lib.constants import _ADDON
+
+def legacy_log(msg, level=xbmc.LOGDEBUG):
+    # utils.log before the debug flag was cached
+    if (level in [xbmc.LOGERROR, xbmc.LOGWARNING] or
+        (_ADDON.getSetting('debug') == 'true')):
+        frame = sys._getframe(1)
+        function_name = frame.f_code.co_name
+        formatted_msg = f"{_ADDON.getAddonInfo('id')}: [{function_name}] {msg}"
+        if level == xbmc.LOGERROR:
+            exc_type, exc_value, exc_tb = sys.exc_info()
+            if exc_type:
+                formatted_msg += f"\nTraceback:\n{''.join(traceback.format_exception(exc_type, exc_value, exc_tb))}"
+        xbmc.log(formatted_msg, level)
+
+def _slow_settings(cost):
+    # Simulate the cost of a settings read crossing into Kodi
+    original = xbmcaddon.Addon.getSetting
+
+    def get_setting(addon, key):
+        end = time.perf_counter() + cost
+        while time.perf_counter() < end:
+            pass
+        return original(addon, key)
+
+    xbmcaddon.Addon.getSetting = get_setting
+
+LEVELS = [('DEBUG', xbmc.LOGDEBUG), ('INFO', xbmc.LOGINFO), ('WARNING', xbmc.LOGWARNING), ('ERROR', xbmc.LOGERROR)]
+
+def _variants(level):
+    video_id, position = 'abc123', 4242
+    return {
+        'legacy f-string': lambda: legacy_log(f"Progress for video {video_id} at position {position}", level),
+        'f-string': lambda: utils.log(f"Progress for video {video_id} at position {position}", level),
+        'lazy args': lambda: utils.log("Progress for video %s at position %d", level, video_id, position),
+        'callable': lambda: utils.log(lambda: f"Progress for video {video_id} at position {position}", level),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark of utils.log')
+    parser.add_argument('--calls', type=int, default=200000, help='calls per measurement')
+    parser.add_argument('--setting-cost-us', type=float, default=0.0, help='simulated cost of a settings read')
+    args = parser.parse_args(_ARGS)
+
+    if args.setting_cost_us:
+        _slow_settings(args.setting_cost_us / 1e6)
+
+    print(f"{'debug':<6} {'level':<8} " + ''.join(f'{name:>17}' for name in _variants(xbmc.LOGDEBUG)))
+    for debug in ('false', 'true'):
+        xbmcaddon.settings['debug'] = debug
+        settings.refresh_settings()
+        for level_name, level in LEVELS:
+            row = f'{debug:<6} {level_name:<8} '
+            for call in _variants(level).values():
+                elapsed = min(timeit.repeat(call, number=args.calls, repeat=3))
+                row += f'{elapsed / args.calls * 1e9:14.0f} ns'
+            print(row, flush=True)
+
+if __name__ == '__main__':
+    main()
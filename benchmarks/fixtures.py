@@ -0,0 +1,165 @@
+"""
+Fixtures served by the benchmark's local talktv.cz stand-in.
+
+Recorded pages can be dropped into benchmarks/fixtures/ and take precedence
+(see RECORDED_NAMES for the file names). Everything else is generated here
+with the same markup the addon scrapes, padded to the size of the real pages
+so parsing cost is comparable.
+"""
+
+import json
+import os
+import re
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Videos in the generated /videa listing, 24 per page like the real site
+TOTAL_VIDEOS = 240
+PAGE_SIZE = 24
+
+# Approximate size of the markup around the content of real HTML pages (bytes)
+PAGE_PADDING = int(os.environ.get('BENCH_PAGE_PADDING', 120000))
+
+RECORDED_NAMES = {
+    'videa': 'videa.html',
+    'videa_page': 'videa_page_{page}.json',
+    'video': 'video.html',
+    'home': 'srv_videos_home.json',
+    'talknews': 'talknews.html',
+    'search': 'hledani.html',
+}
+
+_MONTHS = ['ledna', 'února', 'března', 'dubna', 'května', 'června',
+           'července', 'srpna', 'září', 'října', 'listopadu', 'prosince']
+
+_COLORINGS = ['1', '6', '3', '4', '7', '8']
+
+def _padding(size=PAGE_PADDING):
+    # Navigation, footer and inline SVG icons of the real pages
+    block = ('<li class="nav__item"><a class="nav__link" href="/standashow">'
+             '<svg class="icon" viewBox="0 0 24 24"><path d="M12 2L2 7l10 5 10-5-10-5z"/></svg>'
+             '<span>STANDASHOW</span></a></li>\n')
+    return '<ul class="nav">' + block * max(1, size // len(block)) + '</ul>'
+
+def _page(body):
+    return (f'<!DOCTYPE html><html lang="cs"><head><meta charset="utf-8"><title>TALK</title></head>'
+            f'<body><div class="container"><header>{_padding(PAGE_PADDING // 2)}'
+            f'<div class="popup-account__header-email">bench@example.com</div></header>'
+            f'<main>{body}</main><footer>{_padding(PAGE_PADDING // 2)}</footer></div></body></html>')
+
+def video_slug(index):
+    return f'video-{index}-host-a-tema-dilu-{index:08x}'
+
+def _media_item(index):
+    coloring = _COLORINGS[index % len(_COLORINGS)]
+    hours, minutes = divmod(30 + index % 120, 60)
+    duration = f'{hours}h{minutes}m' if hours else f'{minutes}m'
+    return (f'<a class="media coloring-{coloring}" href="/video/{video_slug(index)}?tc=r-{index:032x}">'
+            f'<div class="media__image"><img data-src="https://static.talktv.cz/upload/videos/{index}-thumb.jpg" '
+            f'src="/img/placeholder.svg" alt=""></div>'
+            f'<div class="media__name"><p>Host {index}: rozhovor o všem možném, díl {index}</p></div>'
+            f'<p class="duration">{duration}</p></a>')
+
+def _list_items(indexes):
+    return ''.join(f'<div class="list__item">{_media_item(i)}</div>' for i in indexes)
+
+def _listing_indexes(page):
+    first = TOTAL_VIDEOS - page * PAGE_SIZE
+    return range(first, max(0, first - PAGE_SIZE), -1)
+
+def listing_page(page=0):
+    indexes = _listing_indexes(page)
+    if page == 0:
+        items = ''.join(_media_item(i) for i in indexes)
+        return 'text/html', _page(f'<div id="videoListContainer">{items}</div>')
+
+    has_next = (page + 1) * PAGE_SIZE < TOTAL_VIDEOS
+    content = ''.join(_media_item(i) for i in indexes)
+    return 'application/json', json.dumps({'content': content, 'next': has_next})
+
+def video_page(slug):
+    match = re.search(r'video-(\d+)-', slug)
+    index = int(match.group(1)) if match else 1
+    token_path = f'{index:08x}-c002-475d-9545-d5e679746370'
+    sources = ''.join(
+        f'<source src="https://vz-bench.b-cdn.net/{token_path}/play_{quality}.mp4" type="video/mp4">'
+        for quality in ('1080p', '720p', '480p', '360p', '240p'))
+    sources = (f'<source src="https://vz-bench.b-cdn.net/{token_path}/playlist.m3u8" '
+               f'type="application/x-mpegURL">{sources}')
+    description = ' '.join(['Rozhovor o technologiích, politice a společnosti.'] * 12)
+    body = (f'<h1 class="details__header">Host {index}: rozhovor o všem možném, díl {index}</h1>'
+            f'<video-js id="player">{sources}</video-js>'
+            f'<div class="details__info">\n                {1 + index % 28}. {_MONTHS[index % 12]} 2024\n'
+            f'                - {description}</div>'
+            f'<div class="details__description-text">{description}</div>'
+            f'<script>initPlayerComponent({{"videoTitle":"Host {index}","videoId":{1000 + index},'
+            f'"debugMode":false,"ssVideoPos":{index * 37 % 3600},"ssVideoTime":1735309692}});</script>')
+    return 'text/html', _page(body)
+
+def home():
+    return 'application/json', json.dumps({
+        'c1': _list_items(range(TOTAL_VIDEOS, TOTAL_VIDEOS - 16, -1)),
+        'c2': _list_items(range(TOTAL_VIDEOS, TOTAL_VIDEOS - 96, -1)),
+        'c3': _list_items(range(TOTAL_VIDEOS - 100, TOTAL_VIDEOS - 116, -1)),
+    })
+
+def talknews():
+    items = ''.join(
+        f'<a class="embed__item" href="/talknews/novinka-{i}"><img src="https://static.talktv.cz/upload/news/{i}.jpg">'
+        f'<span class="embed__tag">livestream standashow</span><h2>Novinka číslo {i}</h2>'
+        f'<div class="embed__meta">{1 + i % 28}. {_MONTHS[i % 12]} 2024</div></a>'
+        for i in range(30, 0, -1))
+    return 'text/html', _page(f'<div class="embed">{items}</div>')
+
+def search():
+    items = ''.join(_media_item(i) for i in range(TOTAL_VIDEOS, TOTAL_VIDEOS - 20, -1))
+    return 'text/html', _page(f'<div id="mainSearchListContainer">{items}</div>')
+
+def _recorded(name, **kwargs):
+    path = os.path.join(FIXTURES_DIR, RECORDED_NAMES[name].format(**kwargs))
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return ('application/json' if path.endswith('.json') else 'text/html'), content
+
+_THUMBNAIL = b'\xff\xd8\xff\xe0' + bytes(24 * 1024)
+
+def render(path, query):
+    """
+    Render the response for a talktv.cz path.
+
+    Args:
+        path (str): URL path
+        query (dict): Parsed query string (lists of values)
+
+    Returns:
+        tuple: (status, content type, body bytes)
+    """
+
+    page = int(query.get('page', ['0'])[0] or 0)
+
+    if path.startswith('/upload/'):
+        # Thumbnails, a placeholder of typical size
+        return 200, 'image/jpeg', _THUMBNAIL
+
+    if path == '/videa' or path.startswith('/seznam-videi/') or path in ('/standashow', '/techguys'):
+        response = _recorded('videa_page', page=page) if page else _recorded('videa')
+        response = response or listing_page(page)
+    elif path.startswith('/video/'):
+        response = _recorded('video') or video_page(path.rsplit('/', 1)[-1])
+    elif path == '/srv/videos/home':
+        response = _recorded('home') or home()
+    elif path == '/srv/log-time':
+        response = ('application/json', '{"status":"ok"}')
+    elif path == '/talknews':
+        response = _recorded('talknews') or talknews()
+    elif path == '/hledani':
+        response = _recorded('search') or search()
+    elif path == '/':
+        response = ('text/html', _page(''))
+    else:
+        return 404, 'text/plain', b'not found'
+
+    content_type, content = response
+    return 200, f'{content_type}; charset=utf-8', content.encode('utf-8')
@@ -0,0 +1,56 @@
+"""
+Minimal stand-in for Kodi's xbmc module, just enough to run the addon outside Kodi.
+"""
+
+import time
+
+LOGDEBUG = 0
+LOGINFO = 1
+LOGWARNING = 2
+LOGERROR = 3
+LOGFATAL = 4
+LOGNONE = 5
+
+# Log lines are counted (and dropped) so logging cost stays part of the measurement
+log_count = 0
+
+def log(msg, level=LOGDEBUG):
+    global log_count
+    log_count += 1
+
+def translatePath(path):
+    return path
+
+def getInfoLabel(label):
+    return ''
+
+def sleep(ms):
+    pass
+
+class Monitor:
+    def abortRequested(self):
+        return False
+
+    def waitForAbort(self, timeout=0):
+        time.sleep(timeout or 0)
+        return False
+
+class Player:
+    def __init__(self):
+        pass
+
+    def isPlaying(self):
+        return False
+
+    def isPlayingVideo(self):
+        return False
+
+    def play(self, item='', listitem=None):
+        pass
+
+class Actor:
+    def __init__(self, name='', role='', order=-1, thumbnail=''):
+        self.name = name
+        self.role = role
+        self.order = order
+        self.thumbnail = thumbnail
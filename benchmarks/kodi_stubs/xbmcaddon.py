@@ -0,0 +1,48 @@
+"""
+Minimal stand-in for Kodi's xbmcaddon module.
+
+Settings default to the values from resources/settings.xml, the benchmark
+overrides some of them (session cookie, cache) through the settings dict.
+"""
+
+import os
+import xml.etree.ElementTree as ET
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _load_defaults():
+    defaults = {}
+    tree = ET.parse(os.path.join(_ROOT, 'resources', 'settings.xml'))
+    for setting in tree.iter('setting'):
+        default = setting.find('default')
+        defaults[setting.get('id')] = (default.text or '') if default is not None else ''
+    return defaults
+
+settings = _load_defaults()
+info = {
+    'id': 'plugin.video.talk.cz',
+    'profile': os.path.join(_ROOT, 'benchmarks', '.profile'),
+    'icon': '',
+}
+
+class Addon:
+    def __init__(self, addon_id=None):
+        pass
+
+    def getSetting(self, key):
+        return settings.get(key, '')
+
+    def getSettingBool(self, key):
+        return settings.get(key) == 'true'
+
+    def setSetting(self, key, value):
+        settings[key] = value
+
+    def setSettingBool(self, key, value):
+        settings[key] = 'true' if value else 'false'
+
+    def getAddonInfo(self, key):
+        return info.get(key, '')
+
+    def openSettings(self):
+        pass
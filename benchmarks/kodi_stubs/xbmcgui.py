@@ -0,0 +1,70 @@
+"""
+Minimal stand-in for Kodi's xbmcgui module.
+"""
+
+INPUT_ALPHANUM = 0
+NOTIFICATION_INFO = 'info'
+NOTIFICATION_WARNING = 'warning'
+NOTIFICATION_ERROR = 'error'
+
+class _InfoTag:
+    def __getattr__(self, name):
+        # setTitle, setPlot, setCast, ... all just store nothing
+        return lambda *args, **kwargs: None
+
+class ListItem:
+    def __init__(self, label='', label2='', path='', offscreen=False):
+        self.label = label
+        self.path = path
+        self.art = {}
+        self.properties = {}
+        self.info_tag = _InfoTag()
+
+    def setArt(self, art):
+        self.art.update(art)
+
+    def setProperty(self, key, value):
+        self.properties[key] = value
+
+    def getVideoInfoTag(self):
+        return self.info_tag
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+class Dialog:
+    # Dialogs are answered negatively, notifications are recorded
+    notifications = []
+
+    def notification(self, heading, message, icon='', time=5000, sound=True):
+        Dialog.notifications.append((heading, message))
+
+    def ok(self, heading, message):
+        return True
+
+    def yesno(self, heading, message, *args, **kwargs):
+        return False
+
+    def select(self, heading, options, *args, **kwargs):
+        return -1
+
+    def input(self, heading, *args, **kwargs):
+        return ''
+
+    def textviewer(self, heading, text, *args, **kwargs):
+        pass
+
+class Window:
+    _properties = {}
+
+    def __init__(self, window_id=-1):
+        pass
+
+    def setProperty(self, key, value):
+        Window._properties[key] = value
+
+    def getProperty(self, key):
+        return Window._properties.get(key, '')
+
+    def clearProperty(self, key):
+        Window._properties.pop(key, None)
@@ -0,0 +1,57 @@
+"""
+Minimal stand-in for Kodi's xbmcplugin module, recording what the addon adds.
+"""
+
+import time
+
+SORT_METHOD_NONE = 0
+SORT_METHOD_UNSORTED = 40
+
+# Directory items and the resolved URL of the current action
+items = []
+resolved = []
+ended = []
+
+# When the first item was added and when the directory was ended (time.perf_counter())
+first_item_at = None
+ended_at = None
+
+def reset():
+    global first_item_at, ended_at
+    items.clear()
+    resolved.clear()
+    ended.clear()
+    first_item_at = None
+    ended_at = None
+
+def _mark_first():
+    global first_item_at
+    if first_item_at is None:
+        first_item_at = time.perf_counter()
+
+def addDirectoryItem(handle, url, listitem, isFolder=False, totalItems=0):
+    _mark_first()
+    items.append((url, listitem, isFolder))
+    return True
+
+def addDirectoryItems(handle, new_items, totalItems=0):
+    _mark_first()
+    items.extend(new_items)
+    return True
+
+def endOfDirectory(handle, succeeded=True, updateListing=False, cacheToDisc=True):
+    global ended_at
+    ended.append(succeeded)
+    ended_at = time.perf_counter()
+
+def setResolvedUrl(handle, succeeded, listitem):
+    resolved.append((succeeded, listitem))
+
+def setPluginCategory(handle, category):
+    pass
+
+def setContent(handle, content):
+    pass
+
+def addSortMethod(handle, sortMethod, *args, **kwargs):
+    pass
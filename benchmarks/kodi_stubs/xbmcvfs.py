@@ -0,0 +1,6 @@
+"""
+Minimal stand-in for Kodi's xbmcvfs module.
+"""
+
+def translatePath(path):
+    return path
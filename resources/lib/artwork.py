@@ -0,0 +1,174 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import xbmc
+from .network import background, create_session
+from .settings import get_settings
+from .utils import log, get_profile_path
+
+# Thumbnails downloaded into the addon profile, oldest (by mtime) evicted above the size limit
+ARTWORK_DIR = 'artwork'
+_MAX_CACHE_BYTES = 150 * 1024 * 1024
+_DOWNLOAD_WORKERS = 4
+_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+# Shown thumbnails get a new mtime for the eviction order only when it is older than this (seconds)
+_TOUCH_AGE = 86400
+
+# File names in the artwork cache (read on first use) and thumbnails to download for this invocation
+_cached_files = None
+_pending = []
+
+def _get_artwork_dir():
+    path = get_profile_path(ARTWORK_DIR)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    return path
+
+def _get_file_name(url):
+    # Stable name for the URL, keeping the image extension so Kodi recognizes the file
+    extension = os.path.splitext(url.split('?')[0])[1].lower()
+    if extension not in _EXTENSIONS:
+        extension = '.jpg'
+    return hashlib.sha1(url.encode('utf-8')).hexdigest() + extension
+
+def _get_cached_files():
+    global _cached_files
+    if _cached_files is None:
+        try:
+            _cached_files = set(os.listdir(_get_artwork_dir()))
+        except OSError:
+            _cached_files = set()
+    return _cached_files
+
+def get_artwork(url):
+    """
+    Get the artwork to show for a remote thumbnail, the local copy if it is cached.
+    A remote thumbnail is not queued for prefetch_artwork(), Kodi downloads the URL
+    it was handed itself. Only thumbnails of the next page are prefetched.
+
+    Args:
+        url (str): Thumbnail URL
+
+    Returns:
+        str: Local path of the cached thumbnail, or the URL itself
+    """
+
+    if not url or not url.startswith('http') or not get_settings().cache_artwork:
+        return url
+
+    file_name = _get_file_name(url)
+    if file_name in _get_cached_files():
+        path = os.path.join(_get_artwork_dir(), file_name)
+        try:
+            # Recently shown thumbnails are evicted last, a day is precise enough for that
+            if time.time() - os.stat(path).st_mtime > _TOUCH_AGE:
+                os.utime(path)
+            return path
+        except OSError:
+            _get_cached_files().discard(file_name)
+
+    return url
+
+def queue_artwork(urls):
+    """
+    Queue thumbnails to be downloaded by prefetch_artwork().
+
+    Args:
+        urls (list): Thumbnail URLs
+    """
+
+    if not get_settings().cache_artwork:
+        return
+
+    cached = _get_cached_files()
+    for url in urls:
+        if url and url.startswith('http') and url not in _pending and _get_file_name(url) not in cached:
+            _pending.append(url)
+
+def prefetch_artwork(should_stop=None):
+    """
+    Download the queued thumbnails into the artwork cache in parallel.
+    Called after the directory was handed to Kodi, so it never delays the listing.
+
+    Args:
+        should_stop (callable): Returns True when the download should be abandoned,
+            e.g. the navigation check of prefetch.get_navigation_check()
+    """
+
+    if not _pending:
+        return
+
+    urls = list(_pending)
+    _pending.clear()
+    directory = _get_artwork_dir()
+    session = create_session()
+
+    def download(url):
+        if should_stop and should_stop():
+            return False
+        file_name = _get_file_name(url)
+        path = os.path.join(directory, file_name)
+        try:
+            with background():
+                response = session.get(url, timeout=10)
+            if response.status_code != 200 or not response.content:
+                return False
+
+            # Write to a temporary file first, Kodi must never see a partial image
+            temp_path = f'{path}.{os.getpid()}.part'
+            try:
+                with open(temp_path, 'wb') as f:
+                    f.write(response.content)
+                os.replace(temp_path, path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            _get_cached_files().add(file_name)
+            return True
+        except Exception as e:
+            log(f"Error downloading artwork {url}: {str(e)}", xbmc.LOGDEBUG)
+            return False
+
+    with ThreadPoolExecutor(max_workers=_DOWNLOAD_WORKERS) as executor:
+        downloaded = sum(executor.map(download, urls))
+
+    log("Downloaded %d of %d thumbnails", xbmc.LOGDEBUG, downloaded, len(urls))
+    if downloaded:
+        _trim_cache(directory)
+
+def _trim_cache(directory):
+    # Evict the least recently used thumbnails above the size limit
+    try:
+        entries = []
+        total = 0
+        for entry in os.scandir(directory):
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path, entry.name))
+                total += stat.st_size
+
+        if total <= _MAX_CACHE_BYTES:
+            return
+
+        entries.sort()
+        for _, size, path, name in entries:
+            if total <= _MAX_CACHE_BYTES * 0.9:
+                break
+            os.remove(path)
+            _get_cached_files().discard(name)
+            total -= size
+        log("Artwork cache trimmed to %d bytes", xbmc.LOGDEBUG, total)
+    except OSError as e:
+        log(f"Error trimming artwork cache: {str(e)}", xbmc.LOGWARNING)
+
+def clear_artwork():
+    """
+    Remove all cached thumbnails.
+    """
+
+    global _cached_files
+    directory = _get_artwork_dir()
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    _cached_files = set()
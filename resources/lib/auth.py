@@ -1,8 +1,11 @@
+import threading
 import time
 import requests
 import xbmc
 import xbmcgui
 from .constants import _ADDON
+from .network import CircuitOpenError, create_session, is_offline
+from .settings import get_settings
 from .utils import log
 
 # Session caching
@@ -14,19 +17,31 @@ _session_cache = {
     'network_error': False  # Track if last failure was network-related (not cookie)
 }
 
+# Guards _session_cache. Threads of the service (TALKNEWS monitor, catalogue sync,
+# outbox flusher) share the session, only one of them validates it at a time.
+_session_lock = threading.RLock()
+
 def get_session():
     """
     Get a requests session with authentication cookie.
     Uses caching to avoid repeated validation requests.
 
+    Safe to call from several threads: callers arriving while the session is
+    being validated wait for that validation and get its result.
+
     Returns:
         requests.Session: A session object with authentication cookie set
         False: Authentication failed (invalid cookie or network error)
     """
+
+    with _session_lock:
+        return _get_session()
+
+def _get_session():
     global _session_cache
     
     current_time = time.time()
-    session_cookie = _ADDON.getSetting('session_cookie')
+    session_cookie = get_settings().session_cookie
 
     # Check if this is the same cookie that failed before
     if (session_cookie and session_cookie == _session_cache['failed_cookie']):
@@ -45,8 +60,13 @@ def get_session():
         log("No session cookie configured", xbmc.LOGWARNING)
         return False
 
-    session = requests.Session()
-    session.cookies.set('PHPSESSID', session_cookie, domain='www.talktv.cz')
+    session = create_session(session_cookie)
+
+    # talktv.cz is down, validating would only fail. Listings are served from cached data,
+    # other requests fail at once (see network.check_circuit)
+    if is_offline():
+        log("talktv.cz is unavailable, using the session without validation", xbmc.LOGINFO)
+        return session
 
     # Retry once on network error (transient failures)
     for attempt in range(2):
@@ -69,8 +89,8 @@ def get_session():
                 _session_cache['network_error'] = False
                 return False
 
-        except requests.exceptions.ConnectionError as e:
-            if attempt == 0:
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt == 0 and not isinstance(e, CircuitOpenError) and not is_offline():
                 log(f"Network error, retrying in 2s: {str(e)}", xbmc.LOGWARNING)
                 time.sleep(2)
                 continue
@@ -106,6 +126,8 @@ def require_session():
         elif _session_cache.get('network_error'):
             xbmcgui.Dialog().notification('Chyba sítě', 'Nelze se připojit k TALK.cz', xbmcgui.NOTIFICATION_ERROR, time=5000)
         return None
+    if is_offline():
+        xbmcgui.Dialog().notification('TALK.cz je nedostupný', 'Zobrazuji uložená data', xbmcgui.NOTIFICATION_WARNING, time=3000)
     return session
 
 def is_cookie_failed():
@@ -115,7 +137,7 @@ def is_cookie_failed():
     Returns:
         bool: True if current cookie is marked as failed
     """
-    session_cookie = _ADDON.getSetting('session_cookie')
+    session_cookie = get_settings().session_cookie
     return session_cookie and session_cookie == _session_cache.get('failed_cookie')
 
 def test_session():
@@ -124,7 +146,7 @@ def test_session():
     """
     
     # Get the session cookie
-    session_cookie = _ADDON.getSetting('session_cookie')
+    session_cookie = get_settings().session_cookie
     log("Testing session cookie", xbmc.LOGINFO)
 
     if not session_cookie:
@@ -137,12 +159,9 @@ def test_session():
             _ADDON.openSettings()
         return False
 
-    session = requests.Session()
+    session = create_session(session_cookie)
 
     try:
-        # Set up the session cookie
-        session.cookies.set('PHPSESSID', session_cookie, domain='www.talktv.cz')
-
         # Test the session by requesting the videos page
         response = session.get('https://www.talktv.cz/videa')
 
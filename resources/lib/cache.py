@@ -1,84 +1,246 @@
+import base64
 import os
 import json
+import threading
 import time
+import zlib
+from contextlib import contextmanager
 import xbmc
 import xbmcgui
-from bs4 import BeautifulSoup
-from .constants import _ADDON
-from .utils import log
+from .artwork import clear_artwork
+from .metrics import parse_html, record_cache, span
+from .settings import get_settings
+from .utils import log, get_profile_path
 
-def get_cache_path():
+# Cache names, the files are <name>.v2.json (minified) in the addon profile.
+# Entries are lists (see the comments), the field names are not repeated in every entry.
+VIDEO_CACHE = 'video_cache'  # video URL -> [description, date, timestamp]
+RESUME_CACHE = 'resume_cache'  # video URL -> [position, timestamp], short-lived (see video.get_web_resume_positions)
+PAGE_CACHE = 'page_cache'  # page URL -> [body, timestamp], body None while it is prefetched, see prefetch.prefetch_next_page
+
+# Field order of the entries, used to migrate the pretty-printed JSON files of older versions
+# (only the video details cache was stored in that format)
+_LEGACY_FIELDS = {
+    VIDEO_CACHE: ('description', 'date', 'timestamp')
+}
+
+# Texts at least this long are stored zlib-compressed, base64 with a marker
+_COMPRESS_MIN = 1024
+_COMPRESSED_MARKER = '\x00z:'
+
+# Video details are cached for 7 days (seconds)
+_DETAILS_TTL = 604800
+
+# Web resume positions (ssVideoPos) are cached only briefly, they change while watching (seconds)
+RESUME_TTL = 300
+
+# Detail parsing only reads the markup around the details, up to this many characters after the last one
+_DETAILS_MARKERS = ('class="details__info', 'class="details__description-text')
+_DETAILS_WINDOW = 16384
+
+# Held while a cache is loaded, changed and saved (see edit_cache), by one thread of the process at a time.
+# Across processes the last save wins.
+_write_lock = threading.RLock()
+
+# Cache files removed by clear_cache()
+_CACHE_FILES = [VIDEO_CACHE, RESUME_CACHE, PAGE_CACHE]
+
+def get_cache_path(name=VIDEO_CACHE):
     """
     Get the path to the cache file.
 
+    Args:
+        name (str): Name of the cache
+
     Returns:
         str: The full path to the cache file
     """
 
-    try:
-        # For Kodi 19+ use xbmcvfs.translatePath
-        import xbmcvfs
-        profile_path = xbmcvfs.translatePath(_ADDON.getAddonInfo('profile'))
-    except ImportError:
-        # Fallback for older Kodi versions
-        profile_path = xbmc.translatePath(_ADDON.getAddonInfo('profile'))
+    return get_profile_path(f'{name}.v2.json')
+
+def pack_text(text):
+    """
+    Prepare a text for storing in a cache, long texts are compressed.
+
+    Args:
+        text (str): Text to store
+
+    Returns:
+        str: Value to put into the cache entry
+    """
+
+    if not text or len(text) < _COMPRESS_MIN:
+        return text
+    packed = zlib.compress(text.encode('utf-8'))
+    return _COMPRESSED_MARKER + base64.b64encode(packed).decode('ascii')
+
+def unpack_text(value):
+    """
+    Get a text stored with pack_text().
+
+    Args:
+        value (str): Value from the cache entry
+
+    Returns:
+        str: The original text
+    """
 
-    if not os.path.exists(profile_path):
-        os.makedirs(profile_path)
+    if value and value.startswith(_COMPRESSED_MARKER):
+        return zlib.decompress(base64.b64decode(value[len(_COMPRESSED_MARKER):])).decode('utf-8')
+    return value
 
-    return os.path.join(profile_path, 'video_cache.json')
+def _get_all_cache_paths(name):
+    # Every file a cache may be in: the current one and the legacy JSON
+    paths = [get_cache_path(name)]
+    if name in _LEGACY_FIELDS:
+        paths.append(get_profile_path(f'{name}.json'))
+    return paths
 
-def load_cache():
+def _migrate_legacy(name):
+    # Pretty-printed JSON with a dict per entry, written by older versions
+    legacy_path = get_profile_path(f'{name}.json')
+    if name not in _LEGACY_FIELDS or not os.path.exists(legacy_path):
+        return {}
+
+    cache_data = {}
+    try:
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            fields = _LEGACY_FIELDS[name]
+            for key, entry in json.load(f).items():
+                values = [entry.get(field, 0 if field == 'timestamp' else '') for field in fields]
+                cache_data[key] = [pack_text(value) if isinstance(value, str) else value for value in values]
+        save_cache(cache_data, name)
+        log("Migrated cache %s (%d entries)", xbmc.LOGINFO, name, len(cache_data))
+    except Exception as e:
+        log(f"Error migrating cache {name}: {str(e)}", xbmc.LOGWARNING)
+
+    try:
+        os.remove(legacy_path)
+    except OSError:
+        pass
+    return cache_data
+
+def load_cache(name=VIDEO_CACHE):
     """
     Load the cache from file.
 
+    Args:
+        name (str): Name of the cache (VIDEO_CACHE, RESUME_CACHE or PAGE_CACHE)
+
     Returns:
-        dict: The cache data
+        dict: Key -> entry list, texts as stored by pack_text()
     """
 
-    cache_path = get_cache_path()
-    if os.path.exists(cache_path):
+    cache_path = get_cache_path(name)
+    if not os.path.exists(cache_path):
+        return _migrate_legacy(name)
+
+    with span('io', f'load {name}') as entry:
         try:
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(cache_path, 'rb') as f:
+                data = f.read()
+            entry['bytes'] = len(data)
+            return json.loads(data.decode('utf-8'))
         except Exception as e:
             log(f"Error loading cache: {str(e)}", xbmc.LOGWARNING)
 
     return {}
 
-def save_cache(cache_data):
+def save_cache(cache_data, name=VIDEO_CACHE):
     """
     Save the cache to file.
 
     Args:
         cache_data (dict): The cache data to save
+        name (str): Name of the cache (VIDEO_CACHE, RESUME_CACHE or PAGE_CACHE)
+    """
+
+    cache_path = get_cache_path(name)
+    with span('io', f'save {name}') as entry:
+        try:
+            data = json.dumps(cache_data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            entry['bytes'] = len(data)
+            # Readers in other threads and processes (plugin, service) see the old or the new file, never a partial one
+            temp_path = f'{cache_path}.{os.getpid()}.{threading.get_ident()}.part'
+            try:
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, cache_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        except Exception as e:
+            log(f"Error saving cache: {str(e)}", xbmc.LOGWARNING)
+
+@contextmanager
+def edit_cache(name=VIDEO_CACHE):
+    """
+    Load a cache for changing it, it is saved when the block ends (not if it raises).
+    Threads of the process editing caches wait for each other, so no update is lost.
+
+    Processes do not: when the plugin and the service edit the same cache at the
+    same time, the last one to save wins and the other's changes are lost. A lost
+    video details or page entry is downloaded again. A lost resume position was
+    queued for the web as well (see outbox), the listing shows the older position
+    until the entry expires and the position is read from the web again.
+
+    Args:
+        name (str): Name of the cache (VIDEO_CACHE, RESUME_CACHE or PAGE_CACHE)
+
+    Example:
+        with edit_cache(RESUME_CACHE) as resume_cache:
+            resume_cache[video_url] = [position, time.time()]
+    """
+
+    with _write_lock:
+        cache_data = load_cache(name)
+        yield cache_data
+        save_cache(cache_data, name)
+
+def clear_cache():
+    """
+    Clear the video description cache, the cached web resume positions and the cached thumbnails.
     """
 
-    cache_path = get_cache_path()
     try:
-        with open(cache_path, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
+        for name in _CACHE_FILES:
+            for cache_path in _get_all_cache_paths(name):
+                if os.path.exists(cache_path):
+                    os.remove(cache_path)
+        clear_artwork()
+        xbmcgui.Dialog().notification('Cache', 'Mezipaměť byla vymazána')
+        log("Cache cleared successfully", xbmc.LOGINFO)
+        return True
     except Exception as e:
-        log(f"Error saving cache: {str(e)}", xbmc.LOGWARNING)
+        log(f"Error clearing cache: {str(e)}", xbmc.LOGERROR)
+        xbmcgui.Dialog().notification('Chyba', 'Chyba při mazání mezipaměti', time=5000)
+        return False
 
-def clear_cache():
+def update_resume_position(video_url, position):
+    """
+    Update the cached web resume position after the position was sent to the web.
+
+    Args:
+        video_url (str): URL of the video
+        position (int): Playback position in seconds
     """
-    Clear the video description cache.
+
+    now = time.time()
+    with edit_cache(RESUME_CACHE) as resume_cache:
+        prune_resume_cache(resume_cache, now)
+        resume_cache[video_url] = [int(position), now]
+
+def prune_resume_cache(resume_cache, now):
     """
+    Remove expired positions from the resume cache, so it does not grow with every video ever listed.
 
-    cache_path = get_cache_path()
-    if os.path.exists(cache_path):
-        try:
-            os.remove(cache_path)
-            xbmcgui.Dialog().notification('Cache', 'Mezipaměť byla vymazána')
-            log("Cache cleared successfully", xbmc.LOGINFO)
-            return True
-        except Exception as e:
-            log(f"Error clearing cache: {str(e)}", xbmc.LOGERROR)
-            xbmcgui.Dialog().notification('Chyba', 'Chyba při mazání mezipaměti', time=5000)
-            return False
+    Args:
+        resume_cache (dict): The resume cache, as given by edit_cache(RESUME_CACHE)
+        now (float): Current time
+    """
 
-    return True
+    for video_url in [video_url for video_url, entry in resume_cache.items() if now - entry[1] >= RESUME_TTL]:
+        del resume_cache[video_url]
 
 def get_video_details(session, video_url):
     """
@@ -92,65 +254,132 @@ def get_video_details(session, video_url):
         tuple: A tuple containing the video description and the date when the video was published
     """
 
+    cached = get_cached_video_details([video_url])
+    if video_url in cached:
+        return cached[video_url]
+
+    description, date = fetch_video_details(session, video_url)
+
+    # Save to cache if enabled
+    if get_settings().use_cache:
+        update_video_details({video_url: (description, date)})
+
+    return description, date
+
+def get_cached_video_details(video_urls):
+    """
+    Look up details of several videos in the cache at once.
+
+    Args:
+        video_urls (list): URLs of the videos
+
+    Returns:
+        dict: Video URL -> (description, date) of the videos with fresh cached details
+    """
+
     # Check if caching is enabled in settings
-    use_cache = _ADDON.getSetting('use_cache')  == 'true'
+    if not get_settings().use_cache:
+        return {}
+
+    cache = load_cache()
+    now = time.time()
+    details = {}
+    for video_url in video_urls:
+        cached_data = cache.get(video_url)
 
-    if use_cache:
-        # Load cache
-        cache = load_cache()
+        # Cache data for 7 days
+        hit = cached_data is not None and now - cached_data[2] < _DETAILS_TTL
+        record_cache('details', hit)
+        if hit:
+            details[video_url] = (unpack_text(cached_data[0]), cached_data[1])
 
-        # Check if we have cached data
-        if video_url in cache:
-            cached_data = cache[video_url]
+    return details
+
+def fetch_video_details(session, video_url):
+    """
+    Download the details of a video, without touching the cache (safe to call from worker threads).
+
+    Args:
+        session (requests.Session): The session to use for the request
+        video_url (str): The URL of the video
 
-            # Cache data for 7 days (604800 seconds)
-            if time.time() - cached_data.get('timestamp', 0) < 604800:
-                return cached_data.get('description', ''), cached_data.get('date', '')
+    Returns:
+        tuple: The video description and publish date, empty strings on error
+    """
 
     try:
-        log(f"Fetching details for video: {video_url}", xbmc.LOGDEBUG)
+        log("Fetching details for video: %s", xbmc.LOGDEBUG, video_url)
         video_response = session.get(video_url)
-        video_soup = BeautifulSoup(video_response.text, 'html.parser')
+        return parse_video_details(video_response.text)
+
+    except Exception as e:
+        log(f"Error fetching video details: {str(e)}", xbmc.LOGERROR)
+        return '', ''
+
+def parse_video_details(html):
+    """
+    Parse the description and the publish date from a video page.
+
+    Args:
+        html (str): HTML of the video page
+
+    Returns:
+        tuple: A tuple containing the video description and the date when the video was published
+    """
 
-        # Get the main details info
-        details_element = video_soup.find('div', class_='details__info')
-        description = ''
-        date = ''
+    video_soup = parse_html(_get_details_markup(html), 'video_details')
 
-        if details_element:
-            main_content = details_element.text.strip()
-            parts = main_content.split('                -', 1)
+    # Get the main details info
+    details_element = video_soup.find('div', class_='details__info')
+    description = ''
+    date = ''
 
-            if len(parts) == 2:
-                date = parts[0].strip()
-                description = parts[1].strip()
+    if details_element:
+        main_content = details_element.text.strip()
+        parts = main_content.split('                -', 1)
+
+        if len(parts) == 2:
+            date = parts[0].strip()
+            description = parts[1].strip()
+        else:
+            description = main_content
+
+    # Get additional description if available
+    description_element = video_soup.find('div', class_='details__description-text')
+    if description_element:
+        additional_description = description_element.text.strip()
+        if additional_description:
+
+            # Only add newline if we have both descriptions
+            if description:
+                description += '\n' + additional_description
             else:
-                description = main_content
-
-        # Get additional description if available
-        description_element = video_soup.find('div', class_='details__description-text')
-        if description_element:
-            additional_description = description_element.text.strip()
-            if additional_description:
-
-                # Only add newline if we have both descriptions
-                if description:
-                    description += '\n' + additional_description
-                else:
-                    description = additional_description
-
-        # Save to cache if enabled
-        if use_cache and (description or date):
-            cache = load_cache()
-            cache[video_url] = {
-                'description': description,
-                'date': date,
-                'timestamp': time.time()
-            }
-            save_cache(cache)
-
-        return description, date
+                description = additional_description
 
-    except Exception as e:
-        log(f"Error fetching video details: {str(e)}", xbmc.LOGERROR)
-        return '', ''
\ No newline at end of file
+    video_soup.decompose()
+    return description, date
+
+def _get_details_markup(html):
+    # The part of the page with the details, a small fraction of the whole page
+    positions = [position for position in map(html.find, _DETAILS_MARKERS) if position != -1]
+    if not positions:
+        return html
+    start = max(html.rfind('<', 0, min(positions)), 0)
+    return html[start:max(positions) + _DETAILS_WINDOW]
+
+def update_video_details(details):
+    """
+    Store details of several videos in the cache at once.
+
+    Args:
+        details (dict): Video URL -> (description, date)
+    """
+
+    details = {url: value for url, value in details.items() if value[0] or value[1]}
+    if not details:
+        return
+
+    now = time.time()
+    with edit_cache() as cache:
+        for video_url, (description, date) in details.items():
+            cache[video_url] = [pack_text(description), date, now]
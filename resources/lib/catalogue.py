@@ -0,0 +1,456 @@
+import mmap
+import os
+import struct
+import time
+from typing import NamedTuple
+import xbmc
+from .db import connect
+from .metrics import parse_html, span
+from .searchindex import upsert_video
+from .utils import log, clean_text, clean_url, get_creator_name_from_coloring, get_profile_path
+
+# All videos, newest first. Page 0 is the HTML page, further pages are JSON (?page=N)
+CATALOGUE_URL = 'https://www.talktv.cz/videa'
+
+# Listing pages show 24 videos
+PAGE_SIZE = 24
+
+# Head sync stops at the first known video, this only limits a very stale catalogue
+_MAX_HEAD_PAGES = 10
+
+# Backfill of older pages is spread over several runs to be gentle on the server
+_BACKFILL_PAGES_PER_RUN = 10
+
+# Foreground listings re-sync the head at most this often (seconds)
+HEAD_SYNC_TTL = 600
+
+# Read-only snapshot of the complete catalogue, rewritten after each sync that changes it.
+# Listings mmap it and read only the records of the requested page:
+#   header       magic, head sync time, number of records, number of creators
+#   offsets      (records + 1) x uint32, record i is data[offsets[i]:offsets[i + 1]]
+#   creators     coloring, first position and count in the creator index
+#   creator idx  record numbers grouped by creator, newest first
+#   data         records, VideoRecord fields in UTF-8 separated by \x1f
+# It covers /videa and the creator listings. The archive lists and the top videos are
+# picked on the site, /videa tells neither which videos they contain nor their order.
+SNAPSHOT_FILE = 'catalogue.snapshot'
+_SNAPSHOT_MAGIC = b'TALKCAT1'
+_HEADER = struct.Struct('<8sdII')
+_CREATOR = struct.Struct('<8sII')
+_INDEX = struct.Struct('<I')
+_FIELD_SEPARATOR = '\x1f'
+
+_API_HEADERS = {
+    'Accept': 'application/json, text/javascript, */*; q=0.01',
+    'X-Requested-With': 'XMLHttpRequest',
+    'Referer': 'https://www.talktv.cz/'
+}
+
+class VideoRecord(NamedTuple):
+    """
+    Listing metadata of a video, plain strings only (no references into the parsed page).
+    """
+
+    url: str
+    title: str
+    creator: str
+    thumb: str
+    duration: str
+    slug: str = ''
+    video_id: str = ''
+    coloring: str = ''
+    description: str = ''  # only known for catalogue rows and cached details
+    date: str = ''
+
+    def columns(self):
+        """
+        Get the known fields as columns of the videos table.
+
+        Returns:
+            dict: Column name -> value, without empty values
+        """
+
+        return {key: value for key, value in self._asdict().items() if value}
+
+def extract_video_record(item):
+    """
+    Extract the listing metadata of a video from its a.media element.
+
+    Args:
+        item (BeautifulSoup object): The a.media element of the video
+
+    Returns:
+        VideoRecord: Metadata of the video (without description and date), or None
+    """
+
+    title_element = item.find('div', class_='media__name')
+    if not title_element or not title_element.p or not item.get('href'):
+        return None
+
+    # Get coloring class from the media element itself
+    item_classes = item.get('class', [])
+    coloring_class = next((c for c in item_classes if 'coloring-' in c), None)
+    coloring = coloring_class.split('-')[-1] if coloring_class else ''
+
+    video_url = clean_url('https://www.talktv.cz' + item['href'])
+    slug = video_url.rstrip('/').split('/')[-1]
+
+    # Get duration
+    duration_element = item.find('p', class_='duration')
+    duration_text = duration_element.text.strip() if duration_element else "0:00"
+
+    # Get thumbnail
+    img_element = item.find('img')
+    thumbnail = img_element.get('data-src', '') if img_element else ''
+    if not thumbnail and img_element:
+        thumbnail = img_element.get('src', '')
+
+    return VideoRecord(
+        url=video_url,
+        title=clean_text(title_element.p.text),
+        creator=get_creator_name_from_coloring(coloring_class),
+        thumb=str(thumbnail),
+        duration=duration_text,
+        slug=slug,
+        video_id=slug.split('-')[-1],
+        coloring=coloring
+    )
+
+def fetch_catalogue_page(session, page):
+    """
+    Fetch one page of the /videa listing.
+
+    Args:
+        session (requests.Session): Authenticated session
+        page (int): Page number, 0 is the first (HTML) page
+
+    Returns:
+        tuple: (list of video records, bool whether there is a next page), or (None, False) on error
+    """
+
+    if page == 0:
+        response = session.get(CATALOGUE_URL, timeout=15)
+        if response.status_code != 200:
+            log(f"Failed to fetch catalogue page: {response.status_code}", xbmc.LOGWARNING)
+            return None, False
+        soup = parse_html(response.text, 'catalogue_page')
+        container = soup.find('div', id='videoListContainer')
+        if not container:
+            log("Could not find video container in catalogue page", xbmc.LOGWARNING)
+            return None, False
+        items, has_next = container.find_all('a', class_='media'), True
+    else:
+        response = session.get(f'{CATALOGUE_URL}?page={page}', headers=_API_HEADERS, timeout=15)
+        if response.status_code != 200:
+            log(f"Failed to fetch catalogue page {page}: {response.status_code}", xbmc.LOGWARNING)
+            return None, False
+        data = response.json()
+        if 'content' not in data:
+            log(f"No content field in catalogue page {page}", xbmc.LOGWARNING)
+            return None, False
+        soup = parse_html(data['content'], 'catalogue_page')
+        items = soup.find_all('a', class_='media')
+        has_next = bool(data.get('next', False))
+
+    records = [record for record in map(extract_video_record, items) if record]
+    # Records hold plain strings, the tree can go at once
+    soup.decompose()
+    return records, has_next
+
+def _get_state(conn, key, default=''):
+    row = conn.execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+    return row['value'] if row else default
+
+def _set_state(conn, key, value):
+    conn.execute('INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)', (key, str(value)))
+
+def _get_snapshot_synced_at():
+    # Head sync time stored in the snapshot, None if there is no valid snapshot
+    try:
+        with open(get_profile_path(SNAPSHOT_FILE), 'rb') as f:
+            magic, synced_at, _, _ = _HEADER.unpack(f.read(_HEADER.size))
+        return synced_at if magic == _SNAPSHOT_MAGIC else None
+    except (OSError, struct.error):
+        return None
+
+def _write_snapshot(conn, path, synced_at):
+    rows = conn.execute(f'''SELECT {', '.join(VideoRecord._fields)} FROM videos
+                            WHERE sort_key IS NOT NULL ORDER BY sort_key DESC''').fetchall()
+    data = bytearray()
+    offsets = []
+    numbers_by_coloring = {}
+    for number, row in enumerate(rows):
+        offsets.append(len(data))
+        data += _FIELD_SEPARATOR.join(str(value).replace(_FIELD_SEPARATOR, ' ') for value in row).encode('utf-8')
+        if row['coloring']:
+            numbers_by_coloring.setdefault(row['coloring'], []).append(number)
+    offsets.append(len(data))
+
+    creators = bytearray()
+    index = []
+    for coloring, numbers in sorted(numbers_by_coloring.items()):
+        creators += _CREATOR.pack(coloring.encode('utf-8'), len(index), len(numbers))
+        index.extend(numbers)
+
+    with span('io', 'save catalogue snapshot') as entry:
+        temp_path = f'{path}.{os.getpid()}.part'
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(_HEADER.pack(_SNAPSHOT_MAGIC, synced_at, len(rows), len(numbers_by_coloring)))
+                f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+                f.write(creators)
+                f.write(struct.pack(f'<{len(index)}I', *index))
+                f.write(data)
+                entry['bytes'] = f.tell()
+            # Listings reading the old snapshot keep their mapping of the replaced file
+            # (on Windows the replace fails while one is open, the next sync tries again)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+def _update_snapshot(conn, changed):
+    # Listings are served from the catalogue only when it is complete, so is the snapshot.
+    # Called once the sync's transactions are committed, the snapshot never holds rows
+    # that a failed transaction rolls back.
+    path = get_profile_path(SNAPSHOT_FILE)
+    try:
+        if _get_state(conn, 'backfill_done') != '1':
+            if os.path.exists(path):
+                os.remove(path)
+            return
+
+        synced_at = float(_get_state(conn, 'head_synced_at', '0'))
+        if changed or _get_snapshot_synced_at() is None:
+            _write_snapshot(conn, path, synced_at)
+        else:
+            # Nothing new, only the head sync time moves
+            with open(path, 'r+b') as f:
+                f.seek(len(_SNAPSHOT_MAGIC))
+                f.write(struct.pack('<d', synced_at))
+    except Exception as e:
+        log(f"Error updating catalogue snapshot: {str(e)}", xbmc.LOGWARNING)
+
+def _read_snapshot_page(page, coloring):
+    # Page of the snapshot as (records, has_next), None if there is no valid snapshot.
+    # Only the header, the index entries and the records of the page are read.
+    try:
+        f = open(get_profile_path(SNAPSHOT_FILE), 'rb')
+    except OSError:
+        return None
+
+    with f, span('io', 'load catalogue snapshot') as entry:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                magic, _, count, creator_count = _HEADER.unpack_from(view, 0)
+                if magic != _SNAPSHOT_MAGIC:
+                    return None
+                offsets_at = _HEADER.size
+                creators_at = offsets_at + (count + 1) * _INDEX.size
+                index_at = creators_at + creator_count * _CREATOR.size
+                data_at = index_at + count * _INDEX.size
+
+                start = page * PAGE_SIZE
+                if coloring:
+                    first, total = 0, 0
+                    key = coloring.encode('utf-8')
+                    for position in range(creator_count):
+                        creator, first, total = _CREATOR.unpack_from(view, creators_at + position * _CREATOR.size)
+                        if creator.rstrip(b'\x00') == key:
+                            break
+                    else:
+                        total = 0
+                    numbers = [_INDEX.unpack_from(view, index_at + (first + i) * _INDEX.size)[0]
+                               for i in range(start, min(start + PAGE_SIZE, total))]
+                else:
+                    total = count
+                    numbers = range(start, min(start + PAGE_SIZE, total))
+
+                records = []
+                entry['bytes'] = 0
+                for number in numbers:
+                    begin, end = struct.unpack_from('<2I', view, offsets_at + number * _INDEX.size)
+                    records.append(VideoRecord(*view[data_at + begin:data_at + end].decode('utf-8').split(_FIELD_SEPARATOR)))
+                    entry['bytes'] += end - begin
+                return records, start + PAGE_SIZE < total
+        except (ValueError, TypeError, struct.error) as e:
+            log(f"Invalid catalogue snapshot: {str(e)}", xbmc.LOGWARNING)
+            return None
+
+def is_catalogue_complete():
+    """
+    Check if the whole back catalogue has been crawled.
+
+    Returns:
+        bool: True if listings can be served from the catalogue
+    """
+
+    # The snapshot only exists for a complete catalogue
+    if _get_snapshot_synced_at() is not None:
+        return True
+
+    try:
+        conn = connect()
+        try:
+            return _get_state(conn, 'backfill_done') == '1'
+        finally:
+            conn.close()
+    except Exception as e:
+        log(f"Error reading catalogue state: {str(e)}", xbmc.LOGWARNING)
+        return False
+
+def sync_catalogue(session, backfill=True, head_ttl=0):
+    """
+    Incrementally sync the local catalogue with /videa.
+
+    The head of the listing is crawled until the first already known video, so a
+    regular run costs a single request. Older pages are backfilled a few pages per
+    run until the end of the listing is reached.
+
+    Args:
+        session (requests.Session): Authenticated session
+        backfill (bool): Whether to continue crawling older pages
+        head_ttl (int): Skip the head sync if it ran less than this many seconds ago
+
+    Returns:
+        list: Records of newly discovered videos (newest first)
+    """
+
+    # A fresh snapshot answers this without opening the database
+    if head_ttl and time.time() - (_get_snapshot_synced_at() or 0) < head_ttl:
+        return []
+
+    conn = connect()
+    try:
+        now = time.time()
+        if head_ttl and now - float(_get_state(conn, 'head_synced_at', '0')) < head_ttl:
+            return []
+
+        new_records = _sync_head(conn, session, now)
+        if backfill and _get_state(conn, 'backfill_done') != '1':
+            _sync_backfill(conn, session, now)
+        return new_records
+    finally:
+        conn.close()
+
+def _sync_head(conn, session, now):
+    # Crawl from the newest page until a known video shows up
+    top = conn.execute('SELECT MAX(sort_key) FROM videos WHERE sort_key IS NOT NULL').fetchone()[0]
+    new_records = []
+    overflow = False
+    for page in range(_MAX_HEAD_PAGES):
+        records, has_next = fetch_catalogue_page(session, page)
+        if records is None:
+            # Nothing is stored, the new videos of the pages read would leave a gap
+            # between them and the known ones. The next run crawls the head again.
+            if page > 0:
+                log(f"Catalogue head sync failed at page {page}", xbmc.LOGWARNING)
+            return []
+        if not records:
+            break
+
+        known = set(row['url'] for row in conn.execute(
+            f'''SELECT url FROM videos WHERE sort_key IS NOT NULL
+                AND url IN ({', '.join('?' * len(records))})''', [r.url for r in records]))
+        reached_known = False
+        for record in records:
+            if record.url in known:
+                reached_known = True
+                break
+            new_records.append(record)
+
+        # An empty catalogue takes only the first page here, the rest is backfilled
+        if reached_known or not has_next or top is None:
+            break
+    else:
+        log("Catalogue head sync reached the page limit, crawling the catalogue again", xbmc.LOGWARNING)
+        overflow = True
+
+    with conn:
+        if overflow:
+            # The known videos are too far down to fill the gap in order. They are put back
+            # in order by a new backfill, which continues after the pages read here.
+            conn.execute('UPDATE videos SET sort_key = NULL WHERE sort_key IS NOT NULL')
+            _set_state(conn, 'backfill_page', _MAX_HEAD_PAGES)
+            _set_state(conn, 'backfill_done', 0)
+            top = None
+
+        top = top if top is not None else 0
+        for i, record in enumerate(new_records):
+            upsert_video(conn, record.url, dict(record.columns(), sort_key=top + len(new_records) - i), now)
+
+        if _get_state(conn, 'backfill_page') == '':
+            # First run, the backfill continues after the first page
+            _set_state(conn, 'backfill_page', 1)
+        _set_state(conn, 'head_synced_at', now)
+
+    _update_snapshot(conn, bool(new_records))
+    if new_records:
+        log(f"Catalogue sync found {len(new_records)} new videos", xbmc.LOGINFO)
+    return new_records
+
+def _sync_backfill(conn, session, now):
+    # Continue crawling older pages where the previous run stopped
+    page = int(_get_state(conn, 'backfill_page', '1'))
+    for _ in range(_BACKFILL_PAGES_PER_RUN):
+        records, has_next = fetch_catalogue_page(session, page)
+        if records is None:
+            return
+
+        with conn:
+            bottom = conn.execute('SELECT MIN(sort_key) FROM videos WHERE sort_key IS NOT NULL').fetchone()[0]
+            bottom = bottom if bottom is not None else 0
+            added = 0
+            for record in records:
+                known = conn.execute('SELECT sort_key FROM videos WHERE url = ?', (record.url,)).fetchone()
+                if known and known['sort_key'] is not None:
+                    # Already crawled (page boundaries shift when new videos are published)
+                    continue
+                added += 1
+                upsert_video(conn, record.url, dict(record.columns(), sort_key=bottom - added), now)
+
+            page += 1
+            _set_state(conn, 'backfill_page', page)
+            if not has_next:
+                _set_state(conn, 'backfill_done', 1)
+                log(f"Catalogue backfill finished at page {page}", xbmc.LOGINFO)
+                break
+    else:
+        log(f"Catalogue backfill continues from page {page} next time", xbmc.LOGDEBUG)
+        return
+
+    _update_snapshot(conn, True)
+
+def get_catalogue_page(page, coloring=None):
+    """
+    Get one page of videos from the local catalogue.
+
+    Served from the snapshot when there is one, so the cost does not grow with
+    the size of the catalogue, otherwise from the database.
+
+    Args:
+        page (int): Page number, 0 is the newest
+        coloring (str): Optional creator coloring number to filter by
+
+    Returns:
+        tuple: (list of VideoRecord tuples, bool whether there is a next page)
+    """
+
+    result = _read_snapshot_page(page, coloring)
+    if result is not None:
+        return result
+
+    conn = connect()
+    try:
+        where = 'sort_key IS NOT NULL'
+        params = []
+        if coloring:
+            where += ' AND coloring = ?'
+            params.append(coloring)
+
+        rows = conn.execute(
+            f'SELECT {", ".join(VideoRecord._fields)} FROM videos WHERE {where} ORDER BY sort_key DESC LIMIT ? OFFSET ?',
+            params + [PAGE_SIZE + 1, page * PAGE_SIZE]).fetchall()
+        return [VideoRecord(*row) for row in rows[:PAGE_SIZE]], len(rows) > PAGE_SIZE
+    finally:
+        conn.close()
@@ -2,7 +2,7 @@ import sys
 import xbmcaddon
 
 _URL = sys.argv[0]  # Base URL of the addon
-_HANDLE = int(sys.argv[1])  # Handle for the Kodi plugin instance
+_HANDLE = int(sys.argv[1]) if len(sys.argv) > 1 else -1  # Handle for the Kodi plugin instance (-1 when running as a service)
 _ADDON = xbmcaddon.Addon()  # Instance of the addon
 ADDON_ID = _ADDON.getAddonInfo('id')  # ID of the addon
 
@@ -0,0 +1,109 @@
+import sqlite3
+import xbmc
+from .utils import log, get_profile_path
+
+# Schema migrations of the local library database, applied in order.
+# PRAGMA user_version holds the number of migrations already applied.
+_MIGRATIONS = [
+    # 1: Videos seen by the addon (listings and detail pages), searchable offline
+    [
+        '''CREATE TABLE IF NOT EXISTS videos (
+            url TEXT PRIMARY KEY,
+            title TEXT NOT NULL DEFAULT '',
+            creator TEXT NOT NULL DEFAULT '',
+            thumb TEXT NOT NULL DEFAULT '',
+            duration TEXT NOT NULL DEFAULT '',
+            description TEXT NOT NULL DEFAULT '',
+            date TEXT NOT NULL DEFAULT '',
+            premiered TEXT NOT NULL DEFAULT '',
+            search_text TEXT NOT NULL DEFAULT '',
+            updated REAL NOT NULL DEFAULT 0
+        )''',
+    ],
+    # 2: Full catalogue crawled from /videa (videos with sort_key set), plus sync state
+    [
+        "ALTER TABLE videos ADD COLUMN slug TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE videos ADD COLUMN video_id TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE videos ADD COLUMN coloring TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE videos ADD COLUMN sort_key REAL",
+        'CREATE INDEX IF NOT EXISTS videos_catalogue ON videos(sort_key) WHERE sort_key IS NOT NULL',
+        'CREATE INDEX IF NOT EXISTS videos_coloring ON videos(coloring, sort_key) WHERE sort_key IS NOT NULL',
+        '''CREATE TABLE IF NOT EXISTS sync_state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )''',
+    ],
+]
+
+# Full-text index over videos.search_text, created only if SQLite has FTS5
+_FTS_TABLE = '''CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+    search_text, content='videos', content_rowid='rowid', tokenize='unicode61 remove_diacritics {}'
+)'''
+
+_FTS_TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS videos_fts_insert AFTER INSERT ON videos BEGIN
+        INSERT INTO videos_fts(rowid, search_text) VALUES (new.rowid, new.search_text);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS videos_fts_delete AFTER DELETE ON videos BEGIN
+        INSERT INTO videos_fts(videos_fts, rowid, search_text) VALUES ('delete', old.rowid, old.search_text);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS videos_fts_update AFTER UPDATE OF search_text ON videos BEGIN
+        INSERT INTO videos_fts(videos_fts, rowid, search_text) VALUES ('delete', old.rowid, old.search_text);
+        INSERT INTO videos_fts(rowid, search_text) VALUES (new.rowid, new.search_text);
+    END''',
+]
+
+def connect():
+    """
+    Open the local library database, creating or migrating it as needed.
+
+    Returns:
+        sqlite3.Connection: Connection with sqlite3.Row rows
+    """
+
+    conn = sqlite3.connect(get_profile_path('library.db'), timeout=10)
+    conn.row_factory = sqlite3.Row
+
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version < len(_MIGRATIONS):
+        with conn:
+            for statements in _MIGRATIONS[version:]:
+                for statement in statements:
+                    conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {len(_MIGRATIONS)}')
+        log(f"Library database migrated to version {len(_MIGRATIONS)}", xbmc.LOGINFO)
+
+    _ensure_fts(conn)
+    return conn
+
+def has_fts(conn):
+    """
+    Check if the full-text index is available.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+
+    Returns:
+        bool: True if the videos_fts table exists
+    """
+
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'videos_fts'").fetchone()
+    return row is not None
+
+def _ensure_fts(conn):
+    # Create the FTS5 index if the SQLite build supports it (not all Kodi builds do)
+    if has_fts(conn):
+        return
+
+    # remove_diacritics 2 needs SQLite 3.27+, fall back to 1 on older versions
+    for remove_diacritics in (2, 1):
+        try:
+            with conn:
+                conn.execute(_FTS_TABLE.format(remove_diacritics))
+                for trigger in _FTS_TRIGGERS:
+                    conn.execute(trigger)
+                conn.execute("INSERT INTO videos_fts(videos_fts) VALUES ('rebuild')")
+            log("Created full-text search index", xbmc.LOGINFO)
+            return
+        except sqlite3.OperationalError as e:
+            log(f"Full-text search not available (remove_diacritics {remove_diacritics}): {str(e)}", xbmc.LOGDEBUG)
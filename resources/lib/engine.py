@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from .cache import fetch_video_details
+from .network import background, is_offline
+
+# Each worker sends its requests through the shared TalkSession, so the rate
+# limit, the single-flight table, the circuit breaker and the cookie jar apply
+_DETAIL_WORKERS = 4
+
+@contextmanager
+def fetch_details(session, video_urls, in_background=False, should_stop=None):
+    """
+    Download the details of several videos concurrently.
+
+    Yields a future for each video, so the caller can take the results in its
+    own order, each as soon as it is ready. Leaving the block waits for the
+    downloads that already started, futures not started yet can be cancelled.
+    While talktv.cz is down (see network.is_offline()) nothing is downloaded
+    and there are no futures. With should_stop, each download first checks it
+    and is skipped once it returns True, its future gives None.
+
+    Args:
+        session (requests.Session): The session used for the requests
+        video_urls (list): URLs of the videos
+        in_background (bool): Whether the requests belong to the background lane
+        should_stop (callable): Optional, returns True when the rest is not needed anymore
+
+    Example:
+        with fetch_details(session, video_urls) as futures:
+            for video_url in video_urls:
+                description, date = futures[video_url].result()
+    """
+
+    video_urls = list(dict.fromkeys(video_urls))
+    if not video_urls or is_offline():
+        yield {}
+        return
+
+    with ThreadPoolExecutor(max_workers=_DETAIL_WORKERS) as executor:
+        yield {video_url: executor.submit(_fetch_in_thread, session, video_url, in_background, should_stop)
+               for video_url in video_urls}
+
+def _fetch_in_thread(session, video_url, in_background, should_stop):
+    if should_stop is not None and should_stop():
+        return None
+    if not in_background:
+        return fetch_video_details(session, video_url)
+    with background():
+        return fetch_video_details(session, video_url)
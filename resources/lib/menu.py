@@ -1,12 +1,21 @@
+import json
+from functools import partial
 import xbmc
 import xbmcgui
 import xbmcplugin
-from bs4 import BeautifulSoup
+from .artwork import get_artwork
 from .auth import require_session
-from .cache import get_video_details
-from .constants import _HANDLE, _ADDON, MENU_CATEGORIES, CREATOR_CATEGORIES, ARCHIVE_CATEGORIES
-from .utils import get_url, get_image_path, log, clean_text, convert_duration_to_seconds, parse_date, get_category_name, clean_url, get_creator_name_from_coloring, get_creator_cast, get_creator_url
-from .video import check_web_resume
+from .cache import get_video_details, get_cached_video_details, update_video_details
+from .catalogue import CATALOGUE_URL, HEAD_SYNC_TTL, extract_video_record, get_catalogue_page, is_catalogue_complete, sync_catalogue
+from .constants import _HANDLE, MENU_CATEGORIES, CREATOR_CATEGORIES, ARCHIVE_CATEGORIES
+from .engine import fetch_details
+from .metrics import parse_html
+from .network import is_offline
+from .prefetch import drop_listing_pages, get_page, queue_next_page
+from .utils import get_url, get_image_path, log, convert_duration_to_seconds, parse_date, get_category_name, get_creator_cast, get_creator_url, get_creator_coloring
+from .searchindex import remember_video
+from .settings import get_settings
+from .video import get_web_resume_positions
 
 # Common headers for TALK.cz API requests
 _API_HEADERS = {
@@ -20,6 +29,7 @@ def list_menu():
     Lists the main menu categories available in the addon
     """
 
+    items = []
     for category in MENU_CATEGORIES:
         # Create a list item for each category
         list_item = xbmcgui.ListItem(label=category['name'])
@@ -49,8 +59,10 @@ def list_menu():
         else:
             url = get_url(action='listing', category_url=category['url'])
 
-        # Add the directory item to the Kodi plugin
-        xbmcplugin.addDirectoryItem(_HANDLE, url, list_item, isFolder=True)
+        items.append((url, list_item, True))
+
+    # Add all directory items to the Kodi plugin at once
+    xbmcplugin.addDirectoryItems(_HANDLE, items, len(items))
 
     # Set the plugin category and content type
     #xbmcplugin.setPluginCategory(_HANDLE, 'Hlavní menu') # Kategorie
@@ -62,6 +74,7 @@ def list_creators():
     Lists the creators and their content available in the addon
     """
 
+    items = []
     for creator in CREATOR_CATEGORIES:
         # Create a list item for each creator
         list_item = xbmcgui.ListItem(label=creator['name'])
@@ -89,8 +102,10 @@ def list_creators():
             ]
             list_item.addContextMenuItems(context_menu)
 
-        # Add the directory item to the Kodi plugin
-        xbmcplugin.addDirectoryItem(_HANDLE, url, list_item, isFolder=True)
+        items.append((url, list_item, True))
+
+    # Add all directory items to the Kodi plugin at once
+    xbmcplugin.addDirectoryItems(_HANDLE, items, len(items))
 
     # Set the plugin category and content type
     xbmcplugin.setPluginCategory(_HANDLE, 'Tvůrci')
@@ -102,6 +117,7 @@ def list_archive():
     Lists the archive items available in the addon
     """
 
+    items = []
     for item in ARCHIVE_CATEGORIES:
         # Create a list item for each archive item
         list_item = xbmcgui.ListItem(label=item['name'])
@@ -120,8 +136,10 @@ def list_archive():
         # Determine the URL for the archive item's content
         url = get_url(action='listing', category_url=item['url'])
 
-        # Add the directory item to the Kodi plugin
-        xbmcplugin.addDirectoryItem(_HANDLE, url, list_item, isFolder=True)
+        items.append((url, list_item, True))
+
+    # Add all directory items to the Kodi plugin at once
+    xbmcplugin.addDirectoryItems(_HANDLE, items, len(items))
 
     # Set the plugin category and content type
     xbmcplugin.setPluginCategory(_HANDLE, 'Archiv')
@@ -143,6 +161,12 @@ def list_videos(category_url):
         xbmcplugin.endOfDirectory(_HANDLE, succeeded=False)
         return
 
+    # Serve the main listing and creator pages from the local catalogue when it's complete
+    coloring = _get_catalogue_coloring(category_url)
+    if (coloring is not None and get_settings().use_catalogue and
+        is_catalogue_complete() and list_catalogue(session, category_url, coloring)):
+        return
+
     try:
         log(f"Listing videos for category: {category_url}", xbmc.LOGINFO)
         original_url = category_url
@@ -154,14 +178,10 @@ def list_videos(category_url):
         log(f"Show creator names: {show_creator} for URL: {category_url}", xbmc.LOGINFO)
 
         # Make the HTTP GET request
-        response = session.get(category_url)
-        if response.status_code != 200:
-            log(f"Failed to fetch category page: {response.status_code}", xbmc.LOGERROR)
+        content = get_page(session, category_url)
+        if content is None:
             return
 
-        video_items = []
-        has_next = False
-
         # Extract current page number from URL if present
         page_number = 1
         if is_paginated:
@@ -171,48 +191,18 @@ def list_videos(category_url):
             except (IndexError, ValueError):
                 page_number = 1
 
-        if is_paginated:
-            log(f"Processing paginated response for page {page_number}", xbmc.LOGDEBUG)
-            try:
-                # Parse the JSON response for paginated content
-                data = response.json()
-                if 'content' in data:
-                    soup = BeautifulSoup(data['content'], 'html.parser')
-                    video_items = soup.find_all('a', class_='media')
-                    has_next = data.get('next', False)
-                    log(f"Found {len(video_items)} videos in paginated response", xbmc.LOGDEBUG)
-                else:
-                    log("No content field in paginated response", xbmc.LOGERROR)
-                    return
-            except Exception as e:
-                log("Failed to parse JSON response for paginated content", xbmc.LOGERROR)
-                return
-        else:
-            log("Processing regular HTML response", xbmc.LOGDEBUG)
-            # Parse the HTML response
-            soup = BeautifulSoup(response.text, 'html.parser')
-            container = soup.find('div', id='videoListContainer')
-            if container:
-                video_items = container.find_all('a', class_='media')
-                has_next = True
-                log(f"Found {len(video_items)} videos in container", xbmc.LOGDEBUG)
-            else:
-                log("Could not find video container in HTML", xbmc.LOGERROR)
-                return
-
-        for item in video_items:
-            #log(f"Processing item: {item.get('class')}", xbmc.LOGINFO)
-            # Process video item with creator names only for main videos section
-            result = process_video_item(item, session, show_creator_in_title=show_creator)
-            if result:
-                list_item, video_url = result
-                url = get_url(action='play', video_url=video_url)
-                xbmcplugin.addDirectoryItem(_HANDLE, url, list_item, isFolder=False)
+        try:
+            records, has_next = _extract_listing(content, is_paginated)
+            log("Found %d videos on page %s", xbmc.LOGDEBUG, len(records), page_number)
+        except Exception as e:
+            log(f"Failed to parse the listing: {str(e)}", xbmc.LOGERROR)
+            return
 
         # No next for "OSTATNÍ"
         if 'filter=ostatni' in category_url:
             has_next = False
 
+        next_item = None
         if has_next:
             # Get base URL without any query parameters
             base_url = original_url.split('?')[0]
@@ -221,17 +211,15 @@ def list_videos(category_url):
             next_page = page_number + 1 if is_paginated else 1
             next_url = f"{base_url}?page={next_page}"
 
-            log(f"Adding next page item: page {next_page}", xbmc.LOGDEBUG)
-            next_item = xbmcgui.ListItem(label='Další strana')
-            next_item.setArt({
-                'icon': get_image_path('fa-folder-next-solid-full.png'),
-                'thumb': get_image_path('fa-folder-next-solid-full.png')
-            })
+            log("Adding next page item: page %s", xbmc.LOGDEBUG, next_page)
+            next_item = (get_url(action='listing', category_url=next_url), _create_next_page_item('Další strana'))
+            queue_next_page(session, next_url, _extract_paginated_listing)
 
-            xbmcplugin.addDirectoryItem(_HANDLE, get_url(action='listing', category_url=next_url), next_item, isFolder=True)
+        # Process video items with creator names only for main videos section
+        add_video_items(session, records, show_creator_in_title=show_creator, next_item=next_item)
 
         # Set the content type and sort method for the directory
-        xbmcplugin.setPluginCategory(_HANDLE, get_category_name(category_url))
+        xbmcplugin.setPluginCategory(_HANDLE, _get_listing_category(get_category_name(category_url)))
         xbmcplugin.setContent(_HANDLE, 'videos')
         xbmcplugin.endOfDirectory(_HANDLE)
 
@@ -239,6 +227,112 @@ def list_videos(category_url):
         log(f"Error in list_videos: {str(e)}", xbmc.LOGERROR)
         xbmcgui.Dialog().notification('Chyba', 'Chyba při načítání videi')
 
+def _extract_listing(content, is_paginated):
+    """
+    Extract the videos of a listing page.
+
+    Args:
+        content (str): Body of the page, JSON for paginated pages (?page=N), HTML otherwise
+        is_paginated (bool): Whether the page is a paginated JSON response
+
+    Returns:
+        tuple: (list of video records, whether there is a next page)
+    """
+
+    if is_paginated:
+        data = json.loads(content)
+        if 'content' not in data:
+            raise ValueError("No content field in paginated response")
+        soup = parse_html(data['content'], 'listing')
+        video_items = soup.find_all('a', class_='media')
+        has_next = data.get('next', False)
+    else:
+        soup = parse_html(content, 'listing')
+        container = soup.find('div', id='videoListContainer')
+        if not container:
+            raise ValueError("Could not find video container in HTML")
+        video_items = container.find_all('a', class_='media')
+        has_next = True
+
+    records = [record for record in map(extract_video_record, video_items) if record]
+    # Records hold plain strings, the tree can go at once
+    soup.decompose()
+    return records, has_next
+
+def _extract_paginated_listing(content):
+    return _extract_listing(content, True)
+
+def _get_listing_category(name):
+    # Listings shown while talktv.cz is down come from cached data
+    return f'{name} (offline)' if is_offline() else name
+
+def _get_catalogue_coloring(category_url):
+    """
+    Get the catalogue filter for a listing URL.
+
+    Args:
+        category_url (str): The URL of the category
+
+    Returns:
+        str: '' for all videos, creator coloring number for creator pages, None if not in the catalogue
+    """
+
+    base_url = category_url.split('?')[0]
+    if base_url == CATALOGUE_URL:
+        return None if 'filter=' in category_url else ''
+
+    return get_creator_coloring(base_url)
+
+def list_catalogue(session, category_url, coloring):
+    """
+    Lists videos from the local catalogue instead of scraping the listing page.
+    The head of the catalogue is synced first, which usually costs a single request.
+
+    Args:
+        session (requests.Session): The session for making HTTP requests
+        category_url (str): The URL of the category (with optional ?page=N)
+        coloring (str): Creator coloring number, '' for all videos
+
+    Returns:
+        bool: True if the listing was served, False to fall back to the web
+    """
+
+    try:
+        new_records = sync_catalogue(session, backfill=False, head_ttl=HEAD_SYNC_TTL)
+        # The service's next sync won't see these videos as new anymore
+        if new_records:
+            drop_listing_pages(new_records)
+    except Exception as e:
+        log(f"Catalogue head sync failed: {str(e)}", xbmc.LOGWARNING)
+
+    try:
+        page = int(category_url.split('page=')[1].split('&')[0]) if 'page=' in category_url else 0
+    except (IndexError, ValueError):
+        page = 0
+
+    try:
+        records, has_next = get_catalogue_page(page, coloring)
+    except Exception as e:
+        log(f"Error reading catalogue: {str(e)}", xbmc.LOGWARNING)
+        return False
+
+    if not records and page == 0:
+        return False
+
+    log("Listing %d videos from catalogue page %d (coloring: %s)", xbmc.LOGINFO, len(records), page, coloring or 'all')
+    show_creator = coloring == ''
+
+    next_item = None
+    if has_next:
+        next_url = f"{category_url.split('?')[0]}?page={page + 1}"
+        next_item = (get_url(action='listing', category_url=next_url), _create_next_page_item('Další strana'))
+
+    add_video_items(session, records, show_creator_in_title=show_creator, next_item=next_item)
+    xbmcplugin.setPluginCategory(_HANDLE, _get_listing_category(get_category_name(category_url)))
+    xbmcplugin.setContent(_HANDLE, 'videos')
+    xbmcplugin.endOfDirectory(_HANDLE)
+    return True
+
 def list_popular(page=1):
     """
     Lists the most popular videos, paginated with 24 items per page (24, 48, 72, ...)
@@ -256,58 +350,27 @@ def list_popular(page=1):
         api_url = f'https://www.talktv.cz/srv/videos/home?pages={page}'
         log(f"Fetching popular videos from API: {api_url}", xbmc.LOGINFO)
 
-        response = session.get(api_url, headers=_API_HEADERS)
-        if response.status_code != 200:
-            log(f"API request failed: {response.status_code}", xbmc.LOGERROR)
+        content = get_page(session, api_url, headers=_API_HEADERS)
+        if content is None:
             return
 
-        data = response.json()
-        if 'c2' not in data:
-            log("No popular videos section in response", xbmc.LOGERROR)
+        try:
+            records, has_next_page = _extract_popular(content, page)
+        except Exception as e:
+            log(f"Failed to parse popular videos: {str(e)}", xbmc.LOGERROR)
             return
 
-        # Get all items
-        soup = BeautifulSoup(data['c2'], 'html.parser')
-        all_items = soup.find_all('div', class_='list__item')
-        total_items = len(all_items)
-
-        # Calculate slice indices for current page
-        ITEMS_PER_PAGE = 24
-        start_idx = (page - 1) * ITEMS_PER_PAGE
-        end_idx = start_idx + ITEMS_PER_PAGE
-
-        # Get only items for current page
-        list_items = all_items[start_idx:end_idx]
-
-        # We have a next page if we have any items beyond our current slice
-        has_next_page = total_items > start_idx + len(list_items) - 1 # -1 otherwise there is no "Next page"
-
-        log(f"Page {page}: Processing items {start_idx} to {end_idx}, total items: {total_items}, has next: {has_next_page}", xbmc.LOGDEBUG)
-        log(f"Page {page}: Processing items {start_idx} to {end_idx} out of {len(all_items)}", xbmc.LOGDEBUG)
-
-        for list_item_div in list_items:
-            item = list_item_div.find('a', class_='media')
-            if not item:
-                continue
-
-            result = process_video_item(item, session)
-            if result:
-                list_item, video_url = result
-                url = get_url(action='play', video_url=video_url)
-                xbmcplugin.addDirectoryItem(_HANDLE, url, list_item, isFolder=False)
-
+        next_item = None
         if has_next_page:  # Add next page only if there are more items available
             next_page = page + 1
-            next_item = xbmcgui.ListItem(label='Další stránka')
-            next_item.setArt({
-                'icon': get_image_path('fa-folder-next-solid-full.png'),
-                'thumb': get_image_path('fa-folder-next-solid-full.png')
-            })
-            url = get_url(action='popular', page=next_page)
-            xbmcplugin.addDirectoryItem(_HANDLE, url, next_item, True)
+            next_item = (get_url(action='popular', page=next_page), _create_next_page_item('Další stránka'))
+            queue_next_page(session, f'https://www.talktv.cz/srv/videos/home?pages={next_page}',
+                            partial(_extract_popular, page=next_page), headers=_API_HEADERS)
+
+        add_video_items(session, records, next_item=next_item)
 
         # Set the plugin category and content type
-        xbmcplugin.setPluginCategory(_HANDLE, 'Populární videa')
+        xbmcplugin.setPluginCategory(_HANDLE, _get_listing_category('Populární videa'))
         xbmcplugin.setContent(_HANDLE, 'videos')
         xbmcplugin.endOfDirectory(_HANDLE)
 
@@ -315,6 +378,45 @@ def list_popular(page=1):
         log("Error in list_popular", xbmc.LOGERROR)
         xbmcgui.Dialog().notification('Chyba', str(e))
 
+def _extract_popular(content, page):
+    """
+    Extract the popular videos of a page, 24 items per page.
+
+    Args:
+        content (str): JSON response of /srv/videos/home?pages=N
+        page (int): Page number, starting from 1
+
+    Returns:
+        tuple: (list of video records, whether there is a next page)
+    """
+
+    data = json.loads(content)
+    if 'c2' not in data:
+        raise ValueError("No popular videos section in response")
+
+    # Get all items
+    soup = parse_html(data['c2'], 'home')
+    all_items = soup.find_all('div', class_='list__item')
+    total_items = len(all_items)
+
+    # Calculate slice indices for current page
+    ITEMS_PER_PAGE = 24
+    start_idx = (page - 1) * ITEMS_PER_PAGE
+    end_idx = start_idx + ITEMS_PER_PAGE
+
+    # Get only items for current page
+    list_items = all_items[start_idx:end_idx]
+
+    # We have a next page if we have any items beyond our current slice
+    has_next_page = total_items > start_idx + len(list_items) - 1 # -1 otherwise there is no "Next page"
+
+    log("Page %d: Processing items %d to %d, total items: %d, has next: %s", xbmc.LOGDEBUG, page, start_idx, end_idx, total_items, has_next_page)
+
+    media_items = [div.find('a', class_='media') for div in list_items]
+    records = [record for record in map(extract_video_record, filter(None, media_items)) if record]
+    soup.decompose()
+    return records, has_next_page
+
 def list_top():
     """
     Lists the top videos (no pagination as there are only 16 items)
@@ -331,32 +433,26 @@ def list_top():
         api_url = 'https://www.talktv.cz/srv/videos/home'
         log(f"Fetching top videos from API: {api_url}", xbmc.LOGINFO)
 
-        response = session.get(api_url, headers=_API_HEADERS)
-        if response.status_code != 200:
-            log(f"API request failed: {response.status_code}", xbmc.LOGERROR)
+        content = get_page(session, api_url, headers=_API_HEADERS)
+        if content is None:
             return
 
-        data = response.json()
+        data = json.loads(content)
         if 'c3' not in data:
             log("No top videos section in response", xbmc.LOGERROR)
             return
 
         # Get c3 items
-        soup = BeautifulSoup(data['c3'], 'html.parser')
+        soup = parse_html(data['c3'], 'home')
         list_items = soup.find_all('div', class_='list__item')
-        for list_item_div in list_items:
-            item = list_item_div.find('a', class_='media')
-            if not item:
-                continue
+        media_items = [div.find('a', class_='media') for div in list_items]
+        records = [record for record in map(extract_video_record, filter(None, media_items)) if record]
+        soup.decompose()
 
-            result = process_video_item(item, session)
-            if result:
-                list_item, video_url = result
-                url = get_url(action='play', video_url=video_url)
-                xbmcplugin.addDirectoryItem(_HANDLE, url, list_item, isFolder=False)
+        add_video_items(session, records)
 
         # Set the plugin category and content type
-        xbmcplugin.setPluginCategory(_HANDLE, 'Nejlepší videa')
+        xbmcplugin.setPluginCategory(_HANDLE, _get_listing_category('Nejlepší videa'))
         xbmcplugin.setContent(_HANDLE, 'videos')
         xbmcplugin.endOfDirectory(_HANDLE)
 
@@ -380,43 +476,98 @@ def list_continue():
         api_url = 'https://www.talktv.cz/srv/videos/home'
         log(f"Fetching continue watching videos from API: {api_url}", xbmc.LOGINFO)
 
-        response = session.get(api_url, headers=_API_HEADERS)
-        if response.status_code != 200:
-            log(f"API request failed: {response.status_code}", xbmc.LOGERROR)
+        # Changes with every video watched, the stored copy is only for outages
+        content = get_page(session, api_url, headers=_API_HEADERS, fresh=True)
+        if content is None:
             return
 
-        data = response.json()
+        data = json.loads(content)
         if 'c1' not in data:
             log("No continue watching section in response", xbmc.LOGERROR)
             return
 
         # Get c1 items
-        soup = BeautifulSoup(data['c1'], 'html.parser')
+        soup = parse_html(data['c1'], 'home')
         list_items = soup.find_all('div', class_='list__item')
-        for list_item_div in list_items:
-            item = list_item_div.find('a', class_='media')
-            if not item:
-                continue
-
-            result = process_video_item(item, session, auto_resume=True)
-            if result:
-                list_item, video_url = result
-                # Use standard play action - resume point is already set in the ListItem
-                url = get_url(action='play', video_url=video_url)
-                xbmcplugin.addDirectoryItem(_HANDLE, url, list_item, isFolder=False)
+        media_items = [div.find('a', class_='media') for div in list_items]
+        records = [record for record in map(extract_video_record, filter(None, media_items)) if record]
+        soup.decompose()
+
+        # The c1 fragment doesn't carry the positions, resolve them for the whole list at once.
+        # The pages downloaded for them carry the details too, so the items below don't download them again.
+        resume_positions, details = get_web_resume_positions(session, [record.url for record in records])
+        records = [record._replace(description=details[record.url][0], date=details[record.url][1])
+                   if record.url in details else record for record in records]
+
+        add_video_items(session, records, resume_positions=resume_positions)
 
         # Set the plugin category and content type
-        xbmcplugin.setPluginCategory(_HANDLE, 'Pokračovat v přehrávání')
+        # Not cached, the positions change with every video watched
+        xbmcplugin.setPluginCategory(_HANDLE, _get_listing_category('Pokračovat v přehrávání'))
         xbmcplugin.setContent(_HANDLE, 'videos')
-        xbmcplugin.endOfDirectory(_HANDLE)
+        xbmcplugin.endOfDirectory(_HANDLE, cacheToDisc=False)
 
     except Exception as e:
         log("Error in list_continue", xbmc.LOGERROR)
         xbmcgui.Dialog().notification('Chyba', str(e))
 
-# In process_video_item(), update how we handle cast:
+def _create_next_page_item(label):
+    next_item = xbmcgui.ListItem(label=label)
+    next_item.setArt({
+        'icon': get_image_path('fa-folder-next-solid-full.png'),
+        'thumb': get_image_path('fa-folder-next-solid-full.png')
+    })
+    return next_item
 
-def process_video_item(item, session, show_creator_in_title=True, auto_resume=False):
+def add_video_items(session, records, show_creator_in_title=True, resume_positions=None, next_item=None):
+    """
+    Add videos to the directory in listing order with a single addDirectoryItems call.
+
+    Details come from the record itself (catalogue), from the cache, or are downloaded
+    concurrently (see engine.fetch_details) while the items before them are being built.
+    Newly downloaded details are written to the cache at once at the end.
+
+    Args:
+        session (requests.Session): The session for making HTTP requests
+        records (list): VideoRecord tuples (see catalogue.extract_video_record), with description and date for catalogue rows
+        show_creator_in_title (bool): Whether to show the creator in the title
+        resume_positions (dict): Web resume positions by video URL (for continue watching)
+        next_item (tuple): Optional (plugin URL, ListItem) of the next page folder, added last
+    """
+
+    items = []
+    missing = [record.url for record in records if not record.description and not record.date]
+    details = get_cached_video_details(missing)
+    fetched = {}
+
+    with fetch_details(session, [video_url for video_url in missing if video_url not in details]) as futures:
+        for record in records:
+            video_url = record.url
+            if video_url in futures:
+                fetched[video_url] = futures[video_url].result()
+                description, date = fetched[video_url]
+            else:
+                description, date = details.get(video_url, (record.description, record.date))
+
+            # Remember everything we know about the video for offline search
+            remember_video(video_url, **record._replace(description=description, date=date)._asdict())
+
+            resume_position = resume_positions.get(video_url) if resume_positions else None
+            list_item = create_video_list_item(video_url, record.title, record.creator, record.thumb,
+                                               record.duration, description, date, show_creator_in_title,
+                                               resume_position)
+            items.append((get_url(action='play', video_url=video_url), list_item, False))
+
+    if next_item:
+        items.append((next_item[0], next_item[1], True))
+
+    # Add all directory items to the Kodi plugin at once
+    xbmcplugin.addDirectoryItems(_HANDLE, items, len(items))
+
+    if fetched and get_settings().use_cache:
+        update_video_details(fetched)
+
+def process_video_item(item, session, show_creator_in_title=True, resume_positions=None, details=None):
     """
     Helper function to process a video item and create a ListItem.
 
@@ -427,53 +578,65 @@ def process_video_item(item, session, show_creator_in_title=True, auto_resume=Fa
         item (BeautifulSoup object): The video item to process.
         session (requests.Session): The session for making HTTP requests.
         show_creator_in_title (bool): Whether to show the creator in the title.
-        auto_resume (bool): Whether to automatically set resume point from web (for continue watching).
+        resume_positions (dict): Web resume positions by video URL to set as resume points (for continue watching).
+        details (tuple): Description and date if already known, otherwise they are looked up.
     """
 
-    title_element = item.find('div', class_='media__name')
-    if not title_element or not title_element.p:
+    record = extract_video_record(item)
+    if not record:
         return None
 
-    # Get coloring class from the media element itself
-    coloring_class = None
-    item_classes = item.get('class', [])
-    coloring_class = next((c for c in item_classes if 'coloring-' in c), None)
+    video_url = record.url
+
+    # Get additional details
+    description, date = details or get_video_details(session, video_url)
+
+    # Remember everything we know about the video for offline search
+    remember_video(video_url, **record._replace(description=description, date=date)._asdict())
+
+    resume_position = resume_positions.get(video_url) if resume_positions else None
+
+    list_item = create_video_list_item(video_url, record.title, record.creator, record.thumb, record.duration,
+                                       description, date, show_creator_in_title, resume_position)
+    return list_item, video_url
+
+def create_video_list_item(video_url, raw_title, creator_name, thumbnail, duration_text, description, date,
+                           show_creator_in_title=True, resume_position=None):
+    """
+    Create a playable ListItem for a video from already known metadata.
 
-    # Get creator name from coloring class
-    creator_name = get_creator_name_from_coloring(coloring_class)
+    Args:
+        video_url (str): URL of the video page
+        raw_title (str): Title of the video
+        creator_name (str): Creator name (empty if unknown)
+        thumbnail (str): Thumbnail URL
+        duration_text (str): Duration like "1h42m"
+        description (str): Video description
+        date (str): Publish date in Czech format like "1. ledna 2021"
+        show_creator_in_title (bool): Whether to show the creator in the title
+        resume_position (int): Web resume position in seconds (for continue watching)
+
+    Returns:
+        xbmcgui.ListItem: The list item
+    """
 
-    # Get basic video info
-    raw_title = clean_text(title_element.p.text)
     full_title = f"[COLOR limegreen]{creator_name}[/COLOR] • {raw_title}" if creator_name else raw_title
 
     # Use either full title with creator or raw title based on parameter
     display_title = full_title if show_creator_in_title else raw_title
 
-    video_url = clean_url('https://www.talktv.cz' + item['href'])
-
-    # Get duration
-    duration_element = item.find('p', class_='duration')
-    duration_text = duration_element.text.strip() if duration_element else "0:00"
-
     # Create list item
     list_item = xbmcgui.ListItem(display_title)
     list_item.setProperty('IsPlayable', 'true')
     list_item.setIsFolder(False)
 
-    # Set thumbnail
-    img_element = item.find('img')
-    thumbnail = img_element.get('data-src', '') if img_element else ''
-    if not thumbnail and img_element:
-        thumbnail = img_element.get('src', '')
-
-    # Set art for the list item
+    # Set art for the list item, the cached copy if the thumbnail was downloaded before
+    thumbnail = get_artwork(thumbnail)
     list_item.setArt({
         'thumb': thumbnail,
         'icon': thumbnail
     })
 
-    # Get additional details
-    description, date = get_video_details(session, video_url)
     duration_seconds = convert_duration_to_seconds(duration_text)
 
     # Set video info
@@ -513,15 +676,13 @@ def process_video_item(item, session, show_creator_in_title=True, auto_resume=Fa
     # Add useful properties for Kodi integration
     # Note: TotalTime is deprecated - using setResumePoint() instead
 
-    # Check for web resume position if auto_resume is enabled
-    resume_position = 0.0
-    if auto_resume:
-        web_position = check_web_resume(video_url)
-        if web_position and web_position > 0:
-            resume_position = float(web_position)
-            log(f"Auto-resume enabled: setting resume position to {resume_position}s for {video_url}", xbmc.LOGINFO)
+    # Use the web resume position if known (continue watching)
+    position = 0.0
+    if resume_position and resume_position > 0:
+        position = float(resume_position)
+        log("Setting web resume position to %ss for %s", xbmc.LOGINFO, position, video_url)
 
-    info_tag.setResumePoint(resume_position, duration_seconds)  # Resume from position, with total duration
+    info_tag.setResumePoint(position, duration_seconds)  # Resume from position, with total duration
     list_item.setProperty('Creator', creator_name)
     list_item.setProperty('Duration', duration_text)  # Original format like "1h42m"
 
@@ -547,4 +708,4 @@ def process_video_item(item, session, show_creator_in_title=True, auto_resume=Fa
 
     list_item.addContextMenuItems(context_menu)
 
-    return list_item, video_url
\ No newline at end of file
+    return list_item
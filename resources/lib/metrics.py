@@ -0,0 +1,227 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import xbmc
+from bs4 import BeautifulSoup
+from .constants import ADDON_ID
+from .settings import get_settings
+from .utils import log, get_profile_path
+
+# Optional per-invocation metrics log in the addon profile, rotated to .1 when full
+METRICS_FILE = 'metrics.jsonl'
+_MAX_FILE_SIZE = 512 * 1024
+
+# Spans of the current invocation, collected between begin() and finish()
+_invocation = {
+    'action': None,
+    'started': 0.0,
+    'spans': []
+}
+_lock = threading.Lock()
+
+def begin(action):
+    """
+    Start collecting metrics for a plugin invocation.
+
+    Args:
+        action (str): Name of the router action
+    """
+
+    with _lock:
+        _invocation['action'] = action
+        _invocation['started'] = time.perf_counter()
+        _invocation['spans'] = []
+
+def _add(entry):
+    with _lock:
+        if _invocation['action'] is not None:
+            _invocation['spans'].append(entry)
+
+@contextmanager
+def span(kind, name, **fields):
+    """
+    Time a block of code as a span of the current invocation.
+
+    Args:
+        kind (str): Span kind, e.g. 'parse' or 'step'
+        name (str): What is being timed
+        **fields: Extra fields stored with the span
+
+    Example:
+        with span('step', 'flush_videos'):
+            flush_videos()
+    """
+
+    entry = {'kind': kind, 'name': name}
+    entry.update(fields)
+    start = time.perf_counter()
+    try:
+        yield entry
+    finally:
+        entry['ms'] = round((time.perf_counter() - start) * 1000, 1)
+        _add(entry)
+
+def record_cache(name, hit):
+    """
+    Count a cache lookup of the current invocation.
+
+    Args:
+        name (str): Cache name, e.g. 'details'
+        hit (bool): Whether the value was found in the cache
+    """
+
+    _add({'kind': 'cache', 'name': name, 'hit': bool(hit)})
+
+def record_wait(name, lane, seconds):
+    """
+    Record how long a request waited for the rate limit of its endpoint.
+
+    Args:
+        name (str): Endpoint class, e.g. '/video'
+        lane (str): 'foreground' or 'background'
+        seconds (float): Time waited
+    """
+
+    _add({'kind': 'wait', 'name': name, 'lane': lane, 'ms': round(seconds * 1000, 1)})
+
+def parse_html(markup, name):
+    """
+    Parse markup with BeautifulSoup, timed as a parse span.
+
+    Args:
+        markup (str): HTML to parse
+        name (str): What is being parsed, e.g. 'video_page'
+
+    Returns:
+        BeautifulSoup: Parsed document
+    """
+
+    with span('parse', name, bytes=len(markup)):
+        return BeautifulSoup(markup, 'html.parser')
+
+def url_class(url):
+    """
+    Reduce a URL to the endpoint it belongs to, for aggregation.
+
+    Args:
+        url (str): Requested URL
+
+    Returns:
+        str: Endpoint class
+
+    Example:
+        url_class('https://www.talktv.cz/video/some-video-123') -> '/video'
+        url_class('https://www.talktv.cz/srv/videos/home') -> '/srv/videos'
+    """
+
+    parts = urlsplit(url)
+    if parts.hostname and parts.hostname != 'www.talktv.cz':
+        return parts.hostname
+
+    segments = [segment for segment in parts.path.split('/') if segment]
+    if not segments:
+        return '/'
+    if segments[0] == 'srv':
+        return '/' + '/'.join(segments[:2])
+    return '/' + segments[0]
+
+def record_response(response, *args, **kwargs):
+    """
+    Response hook of the addon's sessions, records each HTTP call as a span.
+
+    Args:
+        response (requests.Response): Received response
+    """
+
+    if _invocation['action'] is None:
+        return
+
+    # The hook runs before the body is read, so reading it here is part of the call
+    start = time.perf_counter()
+    size = len(response.content) if not kwargs.get('stream') else 0
+    elapsed = response.elapsed.total_seconds() + time.perf_counter() - start
+
+    _add({
+        'kind': 'http',
+        'name': url_class(response.url),
+        'status': response.status_code,
+        'bytes': size,
+        'ms': round(elapsed * 1000, 1)
+    })
+
+def _summarize(action, total_ms, spans):
+    # One line: totals per kind, HTTP broken down by endpoint class
+    http = [s for s in spans if s['kind'] == 'http']
+    parses = [s for s in spans if s['kind'] == 'parse']
+    caches = [s for s in spans if s['kind'] == 'cache']
+    steps = [s for s in spans if s['kind'] == 'step']
+    waits = [s for s in spans if s['kind'] == 'wait']
+    io = [s for s in spans if s['kind'] == 'io']
+
+    endpoints = {}
+    for s in http:
+        count, ms = endpoints.get(s['name'], (0, 0.0))
+        endpoints[s['name']] = (count + 1, ms + s['ms'])
+    by_endpoint = ', '.join(f"{name} {count}x/{ms:.0f}ms" for name, (count, ms)
+                            in sorted(endpoints.items(), key=lambda item: -item[1][1]))
+
+    errors = sum(1 for s in http if s['status'] >= 400)
+    hits = sum(1 for s in caches if s['hit'])
+
+    line = (f"{action} {total_ms:.0f}ms | http {len(http)} req"
+            f" {sum(s['bytes'] for s in http) / 1024:.0f}KiB {sum(s['ms'] for s in http):.0f}ms")
+    if errors:
+        line += f" {errors} errors"
+    if by_endpoint:
+        line += f" ({by_endpoint})"
+    line += f" | parse {len(parses)}x {sum(s['ms'] for s in parses):.0f}ms"
+    line += f" | cache {hits} hit {len(caches) - hits} miss"
+    if io:
+        line += f" | cache files {len(io)}x {sum(s['ms'] for s in io):.0f}ms {sum(s.get('bytes', 0) for s in io) / 1024:.0f}KiB"
+    if waits:
+        foreground = [s for s in waits if s['lane'] == 'foreground']
+        line += (f" | rate limit wait {sum(s['ms'] for s in foreground):.0f}ms foreground"
+                 f" {sum(s['ms'] for s in waits) - sum(s['ms'] for s in foreground):.0f}ms background")
+    for s in steps:
+        line += f" | {s['name']} {s['ms']:.0f}ms"
+    return line
+
+def finish():
+    """
+    Stop collecting metrics, log the summary of the invocation and optionally
+    append it to the metrics file.
+    """
+
+    with _lock:
+        action = _invocation['action']
+        spans = _invocation['spans']
+        total_ms = (time.perf_counter() - _invocation['started']) * 1000
+        _invocation['action'] = None
+        _invocation['spans'] = []
+
+    if action is None:
+        return
+
+    # Logged regardless of the debug setting, one line per invocation
+    xbmc.log(f"{ADDON_ID}: [metrics] {_summarize(action, total_ms, spans)}", xbmc.LOGINFO)
+
+    if get_settings().metrics_file:
+        _append({
+            'time': int(time.time()),
+            'action': action,
+            'ms': round(total_ms, 1),
+            'spans': spans
+        })
+
+def _append(entry):
+    try:
+        path = get_profile_path(METRICS_FILE)
+        if os.path.exists(path) and os.path.getsize(path) > _MAX_FILE_SIZE:
+            os.replace(path, path + '.1')
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+    except Exception as e:
+        log(f"Error writing metrics file: {str(e)}", xbmc.LOGWARNING)
@@ -1,23 +1,56 @@
+import hashlib
+import json
+import os
+import re
 import threading
+import time
 import xbmc
+import xbmcaddon
 import xbmcgui
 from bs4 import BeautifulSoup
 from .auth import get_session
-from .constants import _ADDON
-from .utils import log
+from .constants import _ADDON, ADDON_ID
+from .network import background
+from .settings import SettingsMonitor, get_settings
+from .utils import log, get_profile_path
+
+TALKNEWS_URL = 'https://www.talktv.cz/talknews'
+
+# Conditional request headers, fingerprint of the list, seen items and publish hours,
+# kept between checks and Kodi sessions
+STATE_FILE = 'talknews_state.json'
+
+# Identities of the items already seen, newest first, this many are kept
+_MAX_SEEN = 300
+
+# Longest check interval in hours, chosen in the settings (0=1h, 1=3h, 2=6h, 3=12h, 4=24h, 5=48h)
+_INTERVAL_OPTIONS = [1, 3, 6, 12, 24, 48]
+
+# Around the hours news are usually published the monitor checks this often (seconds),
+# doubling the interval after every check that finds nothing new
+_MIN_INTERVAL = 900
+
+# Learned publish hours decay once the counts add up to this
+_MAX_PUBLISH_COUNT = 50
+
+# Start of a news item in the page, and the parts of the items that identify them
+_ITEM_START = re.compile(rb'<(?:div|a)\b[^>]*class="(?:[^"]*\s)?embed__item[\s"]')
+_ITEM_TITLE_END = b'</h2>'
+_FINGERPRINT_PARTS = re.compile(rb'href="[^"]*"|<h2[^>]*>.*?</h2>', re.S)
 
 class TalkNewsMonitor:
     """
     Background monitor for TALKNEWS updates that keeps session alive
-    and notifies user of new content
+    and notifies user of new content. Runs in the addon service.
     """
 
-    def __init__(self):
+    def __init__(self, on_new_items=None):
         self.running = False
         self.thread = None
-        self.kodi_monitor = xbmc.Monitor()
-        self.last_seen_title = None
+        self.kodi_monitor = SettingsMonitor()
         self.pending_notifications = []
+        # Called with the new items after each check that found some
+        self.on_new_items = on_new_items
 
     def _should_stop(self):
         """Check if the monitor should stop (Kodi exit or manual stop)"""
@@ -43,41 +76,32 @@ class TalkNewsMonitor:
 
     def _monitor_loop(self):
         """Main monitoring loop"""
-        # Load last seen item from settings
-        self.last_seen_title = _ADDON.getSetting('last_talknews_title')
-
         while not self._should_stop():
             try:
                 # Check if monitoring is still enabled
-                if not _ADDON.getSetting('monitor_talknews') == 'true':
+                if not get_settings().monitor_talknews:
                     log("TALKNEWS monitoring disabled, stopping", xbmc.LOGINFO)
                     break
 
-                # Get check interval in hours from enum (0=1h, 1=3h, 2=6h, 3=12h, 4=24h, 5=48h)
-                interval_index = int(_ADDON.getSetting('check_interval'))
-                interval_options = [1, 3, 6, 12, 24, 48]
-
-                if interval_index < 0 or interval_index >= len(interval_options):
-                    interval_hours = 6  # Fallback to default (6 hours)
-                else:
-                    interval_hours = interval_options[interval_index]
-
-                log(f"Checking TALKNEWS (interval: {interval_hours}h)", xbmc.LOGDEBUG)
-
                 # Check for new items
-                self._check_talknews()
+                with background():
+                    new_items = self._check_talknews()
+                if new_items and self.on_new_items:
+                    self.on_new_items(new_items)
 
                 # Check for pending notifications to show
                 self._check_and_show_pending()
 
-                # Wait for the specified interval using Kodi's waitForAbort
-                # which returns True immediately when Kodi is shutting down
-                interval_seconds = interval_hours * 3600
-                for _ in range(interval_seconds // 300):  # 5-minute intervals
-                    if self._should_stop():
-                        break
-                    if self.kodi_monitor.waitForAbort(300):
+                interval = self._next_interval(bool(new_items))
+                log(f"Next TALKNEWS check in {interval // 60} min", xbmc.LOGDEBUG)
+
+                # Wait using Kodi's waitForAbort, which returns True immediately when Kodi is shutting down
+                waited = 0
+                while waited < interval and not self._should_stop():
+                    step = min(300, interval - waited)  # at most 5-minute steps
+                    if self.kodi_monitor.waitForAbort(step):
                         break  # Kodi is shutting down
+                    waited += step
 
                     # Check for pending notifications during wait periods too
                     self._check_and_show_pending()
@@ -90,91 +114,180 @@ class TalkNewsMonitor:
 
         self.running = False
 
+    def _next_interval(self, found_new):
+        """
+        Get the time until the next check.
+
+        Near the hours news usually appear the monitor checks every 15 minutes,
+        backing off while nothing new shows up. Otherwise it waits the interval
+        from the settings, but wakes up for the next publish hour.
+
+        Args:
+            found_new (bool): Whether the last check found a new item
+
+        Returns:
+            int: Seconds to wait
+        """
+
+        interval_index = get_settings().check_interval
+        if interval_index < 0 or interval_index >= len(_INTERVAL_OPTIONS):
+            interval_index = 2  # Fallback to default (6 hours)
+        longest = _INTERVAL_OPTIONS[interval_index] * 3600
+
+        state = _load_state()
+        idle_checks = 0 if found_new else state.get('idle_checks', 0) + 1
+        state['idle_checks'] = idle_checks
+        _save_state(state)
+
+        hours = state.get('publish_hours') or [0.0] * 24
+        now = time.time()
+        current_hour = time.localtime(now).tm_hour
+        if _is_publish_hour(hours, current_hour) or _is_publish_hour(hours, (current_hour + 1) % 24):
+            return min(_MIN_INTERVAL * 2 ** min(idle_checks, 8), longest)
+
+        # Seconds until the next publish hour starts
+        hour_start = now - now % 3600
+        for ahead in range(1, 24):
+            if _is_publish_hour(hours, (current_hour + ahead) % 24):
+                return int(max(_MIN_INTERVAL, min(longest, hour_start + ahead * 3600 - now)))
+        return longest
+
+    def _fetch_items_markup(self, session, state):
+        """
+        Download the markup of the TALKNEWS items.
+
+        The request is conditional (ETag, Last-Modified). The validators of the
+        response are returned rather than stored, the caller stores them once the
+        items are processed: otherwise a failure after the download would make the
+        next check get 304 and miss the items.
+
+        Args:
+            session (requests.Session): The session for making HTTP requests
+            state (dict): Monitor state with the validators of the last processed response
+
+        Returns:
+            tuple: Markup from the first item to the title of the last one (bytes, None if the
+                page did not change or could not be read) and the validators (dict)
+        """
+
+        headers = {}
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+
+        response = session.get(TALKNEWS_URL, headers=headers, timeout=15)
+        if response.status_code == 304:
+            log("TALKNEWS page not modified", xbmc.LOGDEBUG)
+            return None, {}
+        if response.status_code != 200:
+            log(f"Failed to fetch TALKNEWS page: {response.status_code}", xbmc.LOGWARNING)
+            return None, {}
+
+        validators = {
+            'etag': response.headers.get('ETag', ''),
+            'last_modified': response.headers.get('Last-Modified', '')
+        }
+
+        data = response.content
+        start = _ITEM_START.search(data)
+        if not start:
+            return b'', validators
+        end = data.rfind(_ITEM_TITLE_END)
+        if end > start.start():
+            return data[start.start():end + len(_ITEM_TITLE_END)], validators
+        return data[start.start():], validators
+
     def _check_talknews(self):
-        """Check TALKNEWS page for new items"""
+        """
+        Check TALKNEWS page for new items
+
+        Returns:
+            list: New items as (show name, title, meta) tuples, newest first, empty if there are none
+        """
         try:
             # Get a session (this keeps the cookie alive)
             session = get_session()
             if not session:
                 log("Could not get session for TALKNEWS check", xbmc.LOGWARNING)
-                return
+                return []
 
-            response = session.get('https://www.talktv.cz/talknews')
-            if response.status_code != 200:
-                log(f"Failed to fetch TALKNEWS page: {response.status_code}", xbmc.LOGWARNING)
-                return
+            state = _load_state()
+            previous_check = state.get('checked_at', 0)
+            state['checked_at'] = time.time()
+            try:
+                markup, validators = self._fetch_items_markup(session, state)
+            finally:
+                _save_state(state)
 
+            if markup is None:
+                return []
             log("Successfully fetched TALKNEWS page, session is alive", xbmc.LOGDEBUG)
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Links and titles of all items, the same as last time means nothing new (metas may differ)
+            fingerprint = hashlib.sha1(b'\n'.join(_FINGERPRINT_PARTS.findall(markup))).hexdigest()
+            if fingerprint == state.get('fingerprint') and 'seen' in state:
+                log("TALKNEWS items unchanged", xbmc.LOGDEBUG)
+                state.update(validators)
+                _save_state(state)
+                return []
 
-            # Find the first news item (most recent)
-            news_items = soup.find_all(['div', 'a'], class_='embed__item')
-            if not news_items:
+            items = _extract_items(markup)
+            if not items:
                 log("No TALKNEWS items found", xbmc.LOGDEBUG)
-                return
-
-            first_item = news_items[0]
+                state.update(validators)
+                _save_state(state)
+                return []
 
-            # Get title element
-            title_elem = first_item.find('h2')
-            if not title_elem:
-                log("No title found in first TALKNEWS item", xbmc.LOGDEBUG)
-                return
-
-            # Get tag text if exists (show name)
-            tag_elem = first_item.find('span', class_='embed__tag')
-            tag_text = tag_elem.get_text(strip=True) if tag_elem else ""
-
-            # Build full title like in talknews.py with green color formatting
-            title_text = title_elem.text.strip()
-            current_title = f"[COLOR limegreen]{tag_text}[/COLOR] • {title_text}" if tag_text else title_text
-            log(f"Current TALKNEWS title: {current_title[:50]}...", xbmc.LOGDEBUG)
-
-            # Initialize last_seen_title if not set yet
-            if not self.last_seen_title:
-                self.last_seen_title = current_title
-                _ADDON.setSetting('last_talknews_title', current_title)
-                log("Initialized last seen TALKNEWS title", xbmc.LOGINFO)
-                return
+            if 'seen' not in state:
+                seen = _migrate_last_title(items)
+            else:
+                seen = set(state['seen'])
+            new_items = [item for item in items if item[0] not in seen]
 
-            # Check if this is a new item
-            if current_title != self.last_seen_title:
-                log(f"New TALKNEWS item detected: {current_title}", xbmc.LOGINFO)
+            # Newest first, older identities fall off the end
+            identities = [identity for identity, _, _, _ in items]
+            state['seen'] = (identities + [identity for identity in state.get('seen', []) if identity not in identities])[:_MAX_SEEN]
+            state['fingerprint'] = fingerprint
+            state.update(validators)
+            _save_state(state)
 
-                # Get meta text if available
-                meta = first_item.find('div', class_='embed__meta')
-                meta_text = meta.get_text(strip=True) if meta else ""
+            if not new_items:
+                return []
 
-                # Show notification
-                self._show_notification(tag_text, title_text, meta_text)
+            log(f"{len(new_items)} new TALKNEWS items detected, newest: {new_items[0][2]}", xbmc.LOGINFO)
+            _record_publish_time(state, previous_check)
 
-                # Update last seen title
-                self.last_seen_title = current_title
-                _ADDON.setSetting('last_talknews_title', current_title)
+            new_items = [(tag_text, title_text, meta_text) for _, tag_text, title_text, meta_text in new_items]
+            self._show_notification(new_items)
+            return new_items
 
         except Exception as e:
             log(f"Error checking TALKNEWS: {str(e)}", xbmc.LOGERROR)
+            return []
 
-    def _show_notification(self, show_name, title_text, meta_text=""):
-        """Show notification for new TALKNEWS item
+    def _show_notification(self, items):
+        """Show one notification for the new TALKNEWS items
 
         Args:
-            show_name (str): Show/tag name (e.g. "livestream standashow")
-            title_text (str): Article title (e.g. "Host: Petr Ludwig ...")
-            meta_text (str): Additional meta info (date, etc.)
+            items (list): (show name, title, meta) tuples, e.g. ("livestream standashow", "Host: Petr Ludwig ...", "1. června 2024")
         """
         try:
             if self._should_stop():
                 return
 
             # Build full content for ok() dialog
-            ok_content = f"[COLOR limegreen]{show_name.upper()}[/COLOR]\n{title_text}" if show_name else title_text
-            if meta_text:
-                ok_content = f"{ok_content}\n{meta_text}"
-
-            # Build short content for toast notification (uppercased show name, title)
+            entries = []
+            for show_name, title_text, meta_text in items:
+                entry = f"[COLOR limegreen]{show_name.upper()}[/COLOR]\n{title_text}" if show_name else title_text
+                entries.append(f"{entry}\n{meta_text}" if meta_text else entry)
+            ok_content = '\n\n'.join(entries)
+
+            # Build short content for toast notification (uppercased show name, title of the newest item)
+            show_name, title_text, _ = items[0]
             toast_content = f"[COLOR limegreen]{show_name.upper()}[/COLOR]\n{title_text}" if show_name else title_text
+            if len(items) > 1:
+                toast_content = f"{toast_content} (+{len(items) - 1} další)"
 
             # Check if video is playing
             player = xbmc.Player()
@@ -205,11 +318,8 @@ class TalkNewsMonitor:
 
             player = xbmc.Player()
             if not player.isPlayingVideo() and self.pending_notifications:
-                # Show all pending notifications
-                for content in self.pending_notifications:
-                    if self._should_stop():
-                        break
-                    xbmcgui.Dialog().ok('TALKNEWS', content)
+                # Show all pending notifications in one dialog
+                xbmcgui.Dialog().ok('TALKNEWS', '\n\n'.join(self.pending_notifications))
 
                 # Clear pending notifications
                 count = len(self.pending_notifications)
@@ -219,40 +329,127 @@ class TalkNewsMonitor:
         except Exception as e:
             log(f"Error showing TALKNEWS notification: {str(e)}", xbmc.LOGERROR)
 
-# Global monitor instance
+def _load_state():
+    path = get_profile_path(STATE_FILE)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            log(f"Error loading TALKNEWS monitor state: {str(e)}", xbmc.LOGWARNING)
+    return {}
+
+def _save_state(state):
+    try:
+        with open(get_profile_path(STATE_FILE), 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+    except Exception as e:
+        log(f"Error saving TALKNEWS monitor state: {str(e)}", xbmc.LOGWARNING)
+
+def _extract_items(markup):
+    # All items of the list as (identity, show name, title, meta), newest first, in one parse.
+    # The identity is the link of the item, or a hash of the show name and title without one.
+    soup = BeautifulSoup(markup.decode('utf-8', 'replace'), 'html.parser')
+    items = []
+    identities = set()
+    for item in soup.find_all(['div', 'a'], class_='embed__item'):
+        title_elem = item.find('h2')
+        if not title_elem:
+            continue
+
+        tag_elem = item.find('span', class_='embed__tag')
+        tag_text = tag_elem.get_text(strip=True) if tag_elem else ""
+        title_text = title_elem.text.strip()
+        meta = item.find('div', class_='embed__meta')
+        meta_text = meta.get_text(strip=True) if meta else ""
+
+        link = item if item.name == 'a' else item.find('a', class_='embed__item')
+        if link and link.get('href'):
+            identity = link['href']
+        else:
+            identity = 'h:' + hashlib.sha1(f'{tag_text}\n{title_text}'.encode('utf-8')).hexdigest()[:16]
+
+        # An item wrapping its link matches twice
+        if identity not in identities:
+            identities.add(identity)
+            items.append((identity, tag_text, title_text, meta_text))
+    soup.decompose()
+    return items
+
+def _migrate_last_title(items):
+    # Older versions remembered only the title of the newest item. The items above it are new,
+    # without it (first run or reset) all current items count as seen.
+    last_title = xbmcaddon.Addon(ADDON_ID).getSetting('last_talknews_title')
+    if last_title:
+        _ADDON.setSetting('last_talknews_title', '')
+    for position, (_, tag_text, title_text, _) in enumerate(items):
+        title = f"[COLOR limegreen]{tag_text}[/COLOR] • {title_text}" if tag_text else title_text
+        if title == last_title:
+            return set(identity for identity, _, _, _ in items[position:])
+    log("Initialized seen TALKNEWS items", xbmc.LOGINFO)
+    return set(identity for identity, _, _, _ in items)
+
+def _is_publish_hour(hours, hour):
+    # At least one item, and twice as many as an average hour
+    total = sum(hours)
+    return hours[hour] >= 1 and hours[hour] * 24 >= 2 * total
+
+def _record_publish_time(state, previous_check):
+    # The item appeared between the previous check and now, each hour of that window gets a share
+    now = time.time()
+    span_hours = min(24, max(1, int((now - (previous_check or now)) // 3600) + 1))
+    hours = state.get('publish_hours') or [0.0] * 24
+    for ahead in range(span_hours):
+        hours[time.localtime(now - ahead * 3600).tm_hour] += 1.0 / span_hours
+
+    # Older observations fade out, so changes in the schedule are learned
+    if sum(hours) > _MAX_PUBLISH_COUNT:
+        hours = [count / 2 for count in hours]
+    state['publish_hours'] = [round(count, 3) for count in hours]
+    _save_state(state)
+
+# Monitor instance of the service
 _monitor = None
 
-def start_monitor():
-    """Start the TALKNEWS monitor if enabled"""
+def start_monitor(on_new_items=None):
+    """
+    Start the TALKNEWS monitor if it is enabled and not running yet.
+    Called by the service whenever it wakes up, so the monitor follows the setting.
+
+    Args:
+        on_new_items (callable): Called with the list of new items when the monitor finds some
+    """
     global _monitor
 
-    if not _ADDON.getSetting('monitor_talknews') == 'true':
+    if not get_settings().monitor_talknews:
         return
 
     if _monitor and _monitor.running:
         return  # Already running
 
-    _monitor = TalkNewsMonitor()
+    _monitor = TalkNewsMonitor(on_new_items)
     _monitor.start()
 
-def reset_monitor():
-    """Reset the TALKNEWS monitor (clear last seen title and restart)"""
+def stop_monitor():
+    """Stop the TALKNEWS monitor if it is running"""
     global _monitor
 
+    if _monitor:
+        _monitor.stop()
+        _monitor = None
+
+def reset_monitor():
+    """Reset the TALKNEWS monitor (forget the seen items)"""
     try:
-        # Clear the last seen title
+        # The monitor in the service reads the state at its next check
         _ADDON.setSetting('last_talknews_title', '')
-        log("TALKNEWS monitor reset - cleared last seen title", xbmc.LOGINFO)
-
-        # Restart monitor if it was running
-        if _monitor and _monitor.running:
-            _monitor.stop()
-            _monitor = None
-            start_monitor()
-            log("TALKNEWS monitor restarted", xbmc.LOGINFO)
+        path = get_profile_path(STATE_FILE)
+        if os.path.exists(path):
+            os.remove(path)
+        log("TALKNEWS monitor reset - cleared seen items", xbmc.LOGINFO)
 
         xbmcgui.Dialog().notification('TALKNEWS Monitor', 'Monitor byl resetován', time=3000)
 
     except Exception as e:
         log(f"Error resetting TALKNEWS monitor: {str(e)}", xbmc.LOGERROR)
-        xbmcgui.Dialog().notification('Chyba', 'Chyba při resetování monitoru')
\ No newline at end of file
+        xbmcgui.Dialog().notification('Chyba', 'Chyba při resetování monitoru')
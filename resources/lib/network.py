@@ -0,0 +1,356 @@
+import copy
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import requests
+import xbmc
+from .metrics import record_cache, record_response, record_wait, url_class
+from .utils import log, get_profile_path
+
+# Request budgets per endpoint class of talktv.cz: (requests per second, burst)
+# Other hosts (YouTube, video CDN) are not limited
+_BUDGETS = {
+    '/video': (8.0, 8),
+    '/srv': (4.0, 4),
+    '/talknews': (2.0, 4),
+    'www.talktv.cz': (4.0, 4),
+    'static.talktv.cz': (16.0, 16)
+}
+
+# Connections kept per host, enough for all threads that may share a session
+# (detail and artwork workers, the service threads), requests keeps 10 by default
+_POOL_SIZE = 16
+
+# Requests without an explicit timeout give up after this many seconds
+_DEFAULT_TIMEOUT = 15
+
+# Circuit breaker of talktv.cz, shared by the plugin invocations and the service through the profile.
+# After this many failures in a row it opens: requests fail at once for the cooldown, which
+# doubles every time a probe fails. Then one request probes the site (half-open).
+CIRCUIT_FILE = 'circuit.json'
+_FAILURE_THRESHOLD = 3
+_COOLDOWN_MIN = 30
+_COOLDOWN_MAX = 900
+# Another request may probe when a probe takes longer than this (seconds), e.g. its process ended
+_PROBE_TIMEOUT = 60
+# Responses that mean the site is down rather than the request being wrong
+OUTAGE_STATUSES = (502, 503, 504)
+
+_circuit = {'stat': None, 'state': {}}
+_circuit_lock = threading.Lock()
+
+# GET requests being sent right now, shared by all sessions of the process
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+# Lane of the current thread, see background()
+_lane = threading.local()
+
+@contextmanager
+def background():
+    """
+    Mark the requests of the current thread as background work (prefetching,
+    monitors, sync). Background requests give way to foreground requests
+    waiting for the same endpoint and never use the last half of a burst.
+
+    Example:
+        with background():
+            fetch_video_details(session, video_url)
+    """
+
+    previous = getattr(_lane, 'background', False)
+    _lane.background = True
+    try:
+        yield
+    finally:
+        _lane.background = previous
+
+class _TokenBucket:
+    """
+    Token bucket of one endpoint class, shared by all threads of the process.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.foreground_waiting = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, is_background):
+        """
+        Take a token, waiting until one is available.
+
+        Args:
+            is_background (bool): Whether the request belongs to the background lane
+
+        Returns:
+            float: Time waited in seconds
+        """
+
+        start = time.monotonic()
+        needed = 1 + (self.burst / 2 if is_background else 0)
+        with self.condition:
+            if not is_background:
+                self.foreground_waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= needed and (not is_background or not self.foreground_waiting):
+                        self.tokens -= 1
+                        return now - start
+                    self.condition.wait(max((needed - self.tokens) / self.rate, 0.01))
+            finally:
+                if not is_background:
+                    self.foreground_waiting -= 1
+                    self.condition.notify_all()
+
+_buckets = {name: _TokenBucket(rate, burst) for name, (rate, burst) in _BUDGETS.items()}
+
+def _get_bucket(url):
+    hostname = urlsplit(url).hostname
+    if hostname == 'www.talktv.cz':
+        name = url_class(url)
+        name = '/srv' if name.startswith('/srv') else name
+        return name, _buckets.get(name, _buckets[hostname])
+    return hostname, _buckets.get(hostname)
+
+def _wait_for_budget(url):
+    # Client side rate limit, so parallel work never bursts at talktv.cz
+    name, bucket = _get_bucket(url)
+    if bucket is None:
+        return
+    is_background = getattr(_lane, 'background', False)
+    waited = bucket.acquire(is_background)
+    if waited > 0.001:
+        record_wait(name, 'background' if is_background else 'foreground', waited)
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    talktv.cz is considered down (see check_circuit()), the request was not sent.
+    """
+
+def _load_circuit():
+    # Must be called with the lock held. Read again only when the file changed.
+    path = get_profile_path(CIRCUIT_FILE)
+    try:
+        stat = os.stat(path)
+        stat = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        _circuit.update(stat=None, state={})
+        return _circuit['state']
+
+    if stat != _circuit['stat']:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                _circuit['state'] = json.load(f)
+        except Exception as e:
+            log(f"Error loading circuit state: {str(e)}", xbmc.LOGWARNING)
+            _circuit['state'] = {}
+        _circuit['stat'] = stat
+    return _circuit['state']
+
+def _save_circuit(state):
+    # Must be called with the lock held
+    path = get_profile_path(CIRCUIT_FILE)
+    try:
+        temp_path = f'{path}.{os.getpid()}.part'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temp_path, path)
+    except Exception as e:
+        log(f"Error saving circuit state: {str(e)}", xbmc.LOGWARNING)
+    _circuit.update(stat=None, state=state)
+
+def is_offline():
+    """
+    Check if talktv.cz is considered down, so cached data should be shown and
+    optional requests (details, prefetching) skipped.
+
+    Returns:
+        bool: True while the circuit breaker is open, or another request is probing
+    """
+
+    with _circuit_lock:
+        return _is_open(_load_circuit(), time.time())
+
+def _is_open(state, now):
+    if state.get('state') == 'open':
+        return now < state['opened_at'] + state['cooldown']
+    if state.get('state') == 'half_open':
+        return now - state['probe_started'] < _PROBE_TIMEOUT
+    return False
+
+def check_circuit(url):
+    """
+    Let a request through the circuit breaker. Called for every request of a
+    TalkSession, and by code sending requests without one, which then reports
+    the outcome with record_outcome().
+
+    Args:
+        url (str): URL about to be requested
+
+    Returns:
+        bool: Whether the URL is guarded by the breaker (www.talktv.cz, not its static files)
+
+    Raises:
+        CircuitOpenError: The circuit is open, or another request is probing
+    """
+
+    if urlsplit(url).hostname != 'www.talktv.cz':
+        return False
+
+    with _circuit_lock:
+        state = _load_circuit()
+        now = time.time()
+        if _is_open(state, now):
+            raise CircuitOpenError(f"talktv.cz is unavailable, not requesting {url}")
+        if state.get('state', 'closed') != 'closed':
+            # This request probes the site, the others keep failing until it is done
+            log("Circuit half-open, probing talktv.cz", xbmc.LOGINFO)
+            _save_circuit(dict(state, state='half_open', probe_started=now))
+    return True
+
+def record_outcome(ok):
+    """
+    Report the outcome of a request let through by check_circuit().
+
+    Args:
+        ok (bool): False for connection errors, timeouts and outage responses (502, 503, 504)
+    """
+
+    with _circuit_lock:
+        state = _load_circuit()
+        if ok:
+            if state.get('state', 'closed') != 'closed' or state.get('failures'):
+                if state.get('state', 'closed') != 'closed':
+                    log("Circuit closed, talktv.cz is available again", xbmc.LOGINFO)
+                _save_circuit({'state': 'closed', 'failures': 0})
+            return
+
+        failures = state.get('failures', 0) + 1
+        if state.get('state') == 'half_open':
+            cooldown = min(state.get('cooldown', _COOLDOWN_MIN) * 2, _COOLDOWN_MAX)
+        elif failures >= _FAILURE_THRESHOLD and state.get('state') != 'open':
+            cooldown = _COOLDOWN_MIN
+        else:
+            _save_circuit(dict(state, failures=failures))
+            return
+
+        log(f"Circuit open for {cooldown}s after {failures} failed requests to talktv.cz", xbmc.LOGWARNING)
+        _save_circuit({'state': 'open', 'failures': failures, 'opened_at': time.time(), 'cooldown': cooldown})
+
+class _Call:
+    """
+    A GET request in flight, waited for by identical requests made meanwhile.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+class TalkSession(requests.Session):
+    """
+    Session that is polite to talktv.cz.
+
+    Every request to talktv.cz takes a token from the budget of its endpoint
+    class first (see _BUDGETS and background()), and fails at once with
+    CircuitOpenError while the site is down (see check_circuit()).
+
+    A GET for the same URL, parameters, headers and cookies as a request that
+    is still in flight (from any session of the process, e.g. the monitor
+    thread and foreground work in the service) waits for that request and
+    gets a copy of its response instead of going to the network again.
+    Streamed requests and requests with a body are always sent.
+
+    A session may be shared by threads as long as they don't change its
+    settings (headers, hooks, adapters) after create_session(): the cookie jar
+    locks itself and the connection pools are thread-safe and big enough for
+    the addon's workers.
+    """
+
+    def __init__(self):
+        super().__init__()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=_POOL_SIZE)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def _send_request(self, method, url, *args, **kwargs):
+        guarded = check_circuit(url)
+        _wait_for_budget(url)
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if guarded:
+                record_outcome(False)
+            raise
+        if guarded:
+            record_outcome(response.status_code not in OUTAGE_STATUSES)
+        return response
+
+    def request(self, method, url, *args, **kwargs):
+        if not args:
+            kwargs.setdefault('timeout', _DEFAULT_TIMEOUT)
+        if method.upper() != 'GET' or args or kwargs.get('stream') or kwargs.get('data') or kwargs.get('files'):
+            return self._send_request(method, url, *args, **kwargs)
+
+        key = (
+            url,
+            repr(kwargs.get('params')),
+            tuple(sorted((kwargs.get('headers') or {}).items())),
+            tuple(sorted((cookie.domain, cookie.name, cookie.value) for cookie in self.cookies))
+        )
+
+        with _inflight_lock:
+            call = _inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _inflight[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            record_cache('inflight', True)
+            if call.error is not None:
+                raise call.error
+            return copy.copy(call.response)
+
+        try:
+            call.response = self._send_request(method, url, **kwargs)
+            # Read the body before anyone else gets the response
+            call.response.content
+            return call.response
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with _inflight_lock:
+                del _inflight[key]
+            call.done.set()
+
+def create_session(session_cookie=None):
+    """
+    Create a requests session for talktv.cz.
+
+    All sessions of the addon should come from here, so every HTTP call is
+    recorded in the invocation metrics, rate limited and identical concurrent
+    GET requests are sent only once.
+
+    Args:
+        session_cookie (str): PHPSESSID cookie to authenticate with (optional)
+
+    Returns:
+        requests.Session: New session
+    """
+
+    session = TalkSession()
+    if session_cookie:
+        session.cookies.set('PHPSESSID', session_cookie, domain='www.talktv.cz')
+    session.hooks['response'].append(record_response)
+    return session
@@ -0,0 +1,206 @@
+import os
+import json
+import threading
+import time
+import xbmc
+from .auth import get_session
+from .network import background
+from .utils import log, get_profile_path
+
+# Backoff between flush attempts after a failure (seconds)
+_BACKOFF_MIN = 5
+_BACKOFF_MAX = 600
+
+# Entries that keep failing (e.g. 4xx for a removed video) are eventually dropped
+_MAX_ATTEMPTS = 20
+_MAX_AGE = 7 * 24 * 3600
+
+class ProgressOutbox:
+    """
+    Persistent queue of playback positions waiting to be sent to srv/log-time.
+
+    Updates are coalesced per video, only the latest position is kept (the watched
+    seconds are summed). The queue is stored in the addon profile, so positions
+    survive network outages and Kodi restarts.
+    """
+
+    def __init__(self):
+        self.path = get_profile_path('progress_outbox.json')
+        self.lock = threading.Lock()
+        self.entries = self._load()
+        # Numbers every put(), flush() removes an entry only if it is still the one that was sent
+        self.sequence = max((entry.get('q', 0) for entry in self.entries.values()), default=0)
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                log(f"Error loading progress outbox: {str(e)}", xbmc.LOGWARNING)
+        return {}
+
+    def _save(self):
+        # Must be called with the lock held
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+        except Exception as e:
+            log(f"Error saving progress outbox: {str(e)}", xbmc.LOGWARNING)
+
+    def put(self, video_id, position, spent, timestamp=None):
+        """
+        Queue a position update, replacing any pending update for the same video.
+
+        Args:
+            video_id (str): TALK.cz video ID
+            position (int): Playback position in seconds
+            spent (int): Seconds watched since the previous update
+            timestamp (int): Time of the update (default: now)
+        """
+
+        timestamp = int(timestamp or time.time())
+        with self.lock:
+            pending = self.entries.get(video_id)
+            self.sequence += 1
+            self.entries[video_id] = {
+                'q': self.sequence,
+                'p': int(position),
+                't': timestamp,
+                's': int(spent) + (pending['s'] if pending else 0),
+                'attempts': pending['attempts'] if pending else 0,
+                'created': pending['created'] if pending else timestamp
+            }
+            self._save()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    def flush(self, session, timeout=10):
+        """
+        Send all pending updates.
+
+        Args:
+            session (requests.Session): Authenticated session
+            timeout (int): Request timeout in seconds
+
+        Returns:
+            bool: True if the queue is empty afterwards
+        """
+
+        with self.lock:
+            pending = dict(self.entries)
+
+        all_sent = True
+        for video_id, entry in pending.items():
+            sent = False
+            try:
+                response = session.get(
+                    'https://www.talktv.cz/srv/log-time',
+                    params={
+                        'vid': video_id,
+                        'p': entry['p'],
+                        't': entry['t'],
+                        's': entry['s']
+                    },
+                    timeout=timeout
+                )
+                sent = response.status_code == 200
+                if sent:
+                    log("Progress updated for video %s at position %s", xbmc.LOGINFO, video_id, entry['p'])
+                else:
+                    log(f"Failed to update progress: {response.status_code}", xbmc.LOGWARNING)
+            except Exception as e:
+                log(f"Error sending progress update: {str(e)}", xbmc.LOGWARNING)
+
+            with self.lock:
+                current = self.entries.get(video_id)
+                if current is None:
+                    continue
+
+                if sent:
+                    if current.get('q') == entry.get('q'):
+                        # Nothing newer was queued meanwhile
+                        del self.entries[video_id]
+                    else:
+                        # Keep the newer position (its put() already woke the flusher),
+                        # the watched time up to the sent update is already counted
+                        current['s'] = max(0, current['s'] - entry['s'])
+                else:
+                    current['attempts'] += 1
+                    if (current['attempts'] >= _MAX_ATTEMPTS or
+                        time.time() - current['created'] > _MAX_AGE):
+                        log(f"Dropping progress update for video {video_id} after {current['attempts']} attempts", xbmc.LOGWARNING)
+                        del self.entries[video_id]
+                    else:
+                        all_sent = False
+
+                self._save()
+
+            if not sent:
+                # Most likely a network problem, don't hammer the server with the rest
+                break
+
+        return all_sent
+
+class ProgressFlusher(threading.Thread):
+    """
+    Background thread sending queued progress updates with exponential backoff.
+    """
+
+    def __init__(self, outbox):
+        super().__init__()
+        self.daemon = True
+        self.outbox = outbox
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.backoff = 0
+
+    def wake(self):
+        """Request an immediate flush (ignored while backing off)"""
+        if not self.backoff:
+            self.wake_event.set()
+
+    def stop(self, timeout=5):
+        """
+        Stop the thread, trying one last flush first.
+
+        Args:
+            timeout (int): Seconds to wait for the thread to finish
+        """
+
+        self.stop_event.set()
+        self.wake_event.set()
+        self.join(timeout=timeout)
+
+    def run(self):
+        log("Progress flusher started", xbmc.LOGINFO)
+
+        while True:
+            # Wait until woken up, or retry after the backoff period
+            self.wake_event.wait(self.backoff or None)
+            self.wake_event.clear()
+
+            if len(self.outbox):
+                self._flush()
+
+            if self.stop_event.is_set():
+                break
+
+        log("Progress flusher stopped", xbmc.LOGINFO)
+
+    def _flush(self):
+        try:
+            with background():
+                session = get_session()
+                done = bool(session) and self.outbox.flush(session)
+        except Exception as e:
+            log(f"Error flushing progress outbox: {str(e)}", xbmc.LOGWARNING)
+            done = False
+
+        if done:
+            self.backoff = 0
+        else:
+            self.backoff = min(_BACKOFF_MAX, max(_BACKOFF_MIN, self.backoff * 2))
+            log("Progress updates pending, retrying in %ss", xbmc.LOGDEBUG, self.backoff)
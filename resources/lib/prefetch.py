@@ -0,0 +1,268 @@
+import sys
+import time
+from concurrent.futures import as_completed
+import xbmc
+from .artwork import queue_artwork
+from .cache import PAGE_CACHE, load_cache, edit_cache, pack_text, unpack_text, get_cached_video_details, update_video_details
+from .catalogue import CATALOGUE_URL
+from .engine import fetch_details
+from .metrics import record_cache
+from .network import background, is_offline
+from .settings import get_settings
+from .utils import log, get_creator_coloring, get_creator_url
+
+# Stored listing pages are served for 10 minutes (seconds)
+_PAGE_TTL = 600
+
+# With the catalogue sync on, the pages of /videa and of the creators are dropped when a video
+# is published (see drop_listing_pages), so they are served for longer. Not the popular videos,
+# view counts reorder them, nor the archive lists, which are changed by hand.
+_SYNCED_PAGE_TTL = 3 * 3600
+
+# A page being prefetched by another invocation is waited for this long (seconds), then downloaded
+_PREFETCH_WAIT = 15
+_PREFETCH_POLL = 0.1
+
+# Listing pages kept in the page cache, the newest ones. Beyond their TTL they are only
+# served while talktv.cz is down.
+_MAX_STORED_PAGES = 30
+
+POPULAR_URL = 'https://www.talktv.cz/srv/videos/home'
+
+# Details downloaded for new videos, the newest ones (a stale catalogue may find pages of them)
+_MAX_NEW_DETAILS = 24
+
+# Next page of the current listing, downloaded by prefetch_next_page() after the directory is shown
+_next_page = {}
+
+# Pages downloaded by get_page() in this invocation, stored by store_pages() after the directory is shown
+_downloaded_pages = {}
+
+def get_page(session, url, headers=None, fresh=False):
+    """
+    Get the body of a listing page, the stored copy if there is a fresh one.
+    Downloaded pages are stored too (see store_pages()), so while talktv.cz is
+    down a stored copy of any age is used. When the previous invocation is still
+    prefetching the page, its copy is waited for.
+
+    Args:
+        session (requests.Session): The session for making HTTP requests
+        url (str): URL of the listing page
+        headers (dict): Optional request headers
+        fresh (bool): Always download the page, the stored copy is only used while talktv.cz is down
+
+    Returns:
+        str: Body of the page, None if the request failed or talktv.cz is down and there is no copy
+    """
+
+    cached = load_cache(PAGE_CACHE).get(url)
+    if cached is not None and cached[0] is None:
+        cached = _wait_for_prefetch(url, cached[1])
+    offline = is_offline()
+    hit = cached is not None and cached[0] is not None and (
+        offline or (not fresh and time.time() - cached[1] < _get_page_ttl(url)))
+    record_cache('page', hit)
+    if hit:
+        log("Using stored page: %s", xbmc.LOGDEBUG, url)
+        return unpack_text(cached[0])
+    if offline:
+        log(f"No stored copy of page {url} while talktv.cz is down", xbmc.LOGWARNING)
+        return None
+
+    response = session.get(url, headers=headers)
+    if response.status_code != 200:
+        log(f"Failed to fetch page {url}: {response.status_code}", xbmc.LOGERROR)
+        return None
+    if get_settings().use_cache:
+        _downloaded_pages[url] = [pack_text(response.text), time.time()]
+    return response.text
+
+def store_pages():
+    """
+    Store the pages downloaded by get_page() in the page cache.
+    Called after the directory was handed to Kodi, so the write never delays the listing.
+    """
+
+    if not _downloaded_pages:
+        return
+
+    with edit_cache(PAGE_CACHE) as pages:
+        pages.update(_downloaded_pages)
+        _prune_pages(pages, time.time())
+    _downloaded_pages.clear()
+
+def _prune_pages(pages, now):
+    # Markers of prefetches that never finished, and all but the newest pages
+    for key in [key for key, value in pages.items() if value[0] is None and now - value[1] >= _PREFETCH_WAIT]:
+        del pages[key]
+    for key in sorted(pages, key=lambda key: pages[key][1], reverse=True)[_MAX_STORED_PAGES:]:
+        del pages[key]
+
+def _wait_for_prefetch(url, started):
+    # The body of a page whose download started at started, None if it does not arrive in time
+    monitor = xbmc.Monitor()
+    while time.time() - started < _PREFETCH_WAIT:
+        if monitor.waitForAbort(_PREFETCH_POLL):
+            return None
+        cached = load_cache(PAGE_CACHE).get(url)
+        if cached is None or cached[0] is not None:
+            return cached
+    return None
+
+def _get_page_ttl(url):
+    base_url = url.split('?')[0]
+    if get_settings().use_catalogue and (base_url == CATALOGUE_URL or get_creator_coloring(base_url)):
+        return _SYNCED_PAGE_TTL
+    return _PAGE_TTL
+
+def queue_next_page(session, url, extract_records, headers=None):
+    """
+    Remember the next page of the listing being shown, for prefetch_next_page().
+
+    Args:
+        session (requests.Session): The session for making HTTP requests
+        url (str): URL of the next listing page
+        extract_records (callable): Turns the page body into (records, has_next)
+        headers (dict): Optional request headers
+    """
+
+    if not get_settings().use_cache or is_offline():
+        return
+
+    _next_page.update(session=session, url=url, extract_records=extract_records, headers=headers)
+
+def _navigated_away(paths):
+    # The user left the listing (or Kodi is shutting down), the next page is not needed anymore
+    if xbmc.Monitor().abortRequested():
+        return True
+    folder_path = xbmc.getInfoLabel('Container.FolderPath')
+    return bool(folder_path) and folder_path not in paths
+
+def get_navigation_check():
+    """
+    Get a check whether the user left the directory of this invocation, for the
+    background work done after the directory was handed to Kodi.
+
+    Returns:
+        callable: Returns True once another folder is shown or Kodi is shutting down
+    """
+
+    # Kodi may still show the previous folder for a moment after endOfDirectory
+    paths = {xbmc.getInfoLabel('Container.FolderPath'), sys.argv[0] + sys.argv[2]}
+    return lambda: _navigated_away(paths)
+
+def prefetch_next_page(should_stop=None):
+    """
+    Download the queued next page and the details of its videos into the caches.
+    Called after the directory was handed to Kodi, stops when the user navigates elsewhere.
+
+    The page is marked in the page cache while it downloads and stored as soon as
+    it arrives, so opening it meanwhile waits for this copy (see get_page()).
+
+    Args:
+        should_stop (callable): Navigation check, see get_navigation_check() (the default)
+    """
+
+    if not _next_page:
+        return
+
+    page = dict(_next_page)
+    _next_page.clear()
+    url = page['url']
+    should_stop = should_stop or get_navigation_check()
+
+    if should_stop():
+        return
+
+    with edit_cache(PAGE_CACHE) as pages:
+        pages[url] = [None, time.time()]
+
+    body = None
+    try:
+        with background():
+            response = page['session'].get(url, headers=page['headers'])
+        if response.status_code != 200:
+            log(f"Failed to prefetch page {url}: {response.status_code}", xbmc.LOGWARNING)
+            return
+        body = response.text
+
+        now = time.time()
+        with edit_cache(PAGE_CACHE) as pages:
+            pages[url] = [pack_text(body), now]
+            _prune_pages(pages, now)
+
+        records, _ = page['extract_records'](body)
+    except Exception as e:
+        log(f"Error prefetching page {url}: {str(e)}", xbmc.LOGWARNING)
+        return
+    finally:
+        if body is None:
+            with edit_cache(PAGE_CACHE) as pages:
+                if url in pages and pages[url][0] is None:
+                    del pages[url]
+
+    queue_artwork([record.thumb for record in records])
+
+    video_urls = [record.url for record in records if not record.description and not record.date]
+    cached = get_cached_video_details(video_urls)
+    missing = [video_url for video_url in video_urls if video_url not in cached]
+    fetched = {}
+
+    # Every download checks the navigation before it starts, not only the loop after each one
+    with fetch_details(page['session'], missing, in_background=True,
+                       should_stop=should_stop) as futures:
+        video_urls_by_future = {future: video_url for video_url, future in futures.items()}
+        for future in as_completed(video_urls_by_future):
+            if future.result() is not None:
+                fetched[video_urls_by_future[future]] = future.result()
+            if should_stop():
+                log("Navigated away, stopping prefetch of %s", xbmc.LOGDEBUG, url)
+                for pending in futures.values():
+                    pending.cancel()
+                break
+
+    log("Prefetched page %s, details of %d of %d videos", xbmc.LOGDEBUG, url, len(fetched), len(missing))
+    if fetched:
+        update_video_details(fetched)
+
+def drop_listing_pages(records):
+    """
+    Drop the stored listing pages that newly published videos change: the popular
+    videos, the /videa listing and the listings of the videos' creators.
+    Called when a catalogue sync finds new videos.
+
+    Args:
+        records (list): VideoRecord tuples of the new videos
+    """
+
+    affected = {POPULAR_URL, CATALOGUE_URL}
+    affected.update(filter(None, (get_creator_url(record.creator) for record in records)))
+
+    with edit_cache(PAGE_CACHE) as pages:
+        dropped = [url for url in pages if url.split('?')[0] in affected]
+        for url in dropped:
+            del pages[url]
+    log("Dropped %d cached listing pages", xbmc.LOGDEBUG, len(dropped))
+
+def invalidate_listings(session, records):
+    """
+    Refresh what a newly published video changes, called by the service when the
+    catalogue sync finds new videos. The affected listing pages are dropped (see
+    drop_listing_pages()), and the details of the new videos are downloaded into the cache.
+
+    Args:
+        session (requests.Session): The session for making HTTP requests
+        records (list): VideoRecord tuples of the new videos
+    """
+
+    drop_listing_pages(records)
+
+    video_urls = [record.url for record in records[:_MAX_NEW_DETAILS]]
+    cached = get_cached_video_details(video_urls)
+    missing = [video_url for video_url in video_urls if video_url not in cached]
+    with fetch_details(session, missing, in_background=True) as futures:
+        fetched = {video_url: future.result() for video_url, future in futures.items()}
+
+    log("Downloaded details of %d new videos", xbmc.LOGDEBUG, len(fetched))
+    if fetched:
+        update_video_details(fetched)
@@ -0,0 +1,235 @@
+import time
+import xbmc
+import xbmcgui
+from .cache import update_resume_position
+from .utils import log
+
+# Window properties used to hand a playback over from the plugin to the service.
+# The plugin interpreter exits right after setResolvedUrl, so the long-lived
+# service picks the video up from here once Kodi reports onAVStarted.
+_HOME_WINDOW_ID = 10000
+_PROP_VIDEO_ID = 'plugin.video.talk.cz.video_id'
+_PROP_VIDEO_URL = 'plugin.video.talk.cz.video_url'
+_PROP_START_TIME = 'plugin.video.talk.cz.start_time'
+_PROP_REGISTERED_AT = 'plugin.video.talk.cz.registered_at'
+
+# Handoff older than this is ignored (playback of something else started later)
+_HANDOFF_TTL = 60
+
+# Position is sampled locally (no HTTP) while playing, so the final position
+# is known even after Kodi stops reporting getTime() on stop
+SAMPLE_INTERVAL = 5
+
+# Coarse heartbeat for sending the position to the server during playback
+HEARTBEAT_INTERVAL = 60
+
+# How often the service wakes up when nothing is being tracked
+IDLE_INTERVAL = 30
+
+def register_playback(video_id, video_url, start_time=None):
+    """
+    Register a video for progress reporting by the service.
+
+    Args:
+        video_id (str): TALK.cz video ID (from initPlayerComponent)
+        video_url (str): URL of the video page
+        start_time (int): Optional start position in seconds
+    """
+
+    window = xbmcgui.Window(_HOME_WINDOW_ID)
+    window.setProperty(_PROP_VIDEO_ID, str(video_id))
+    window.setProperty(_PROP_VIDEO_URL, video_url)
+    window.setProperty(_PROP_START_TIME, str(int(start_time or 0)))
+    window.setProperty(_PROP_REGISTERED_AT, str(int(time.time())))
+    log(f"Registered video {video_id} for progress reporting", xbmc.LOGINFO)
+
+def _take_playback():
+    """
+    Take (and clear) the playback registered by the plugin.
+
+    Returns:
+        tuple: (video_id, video_url, start_time) or (None, None, 0) if nothing valid is registered
+    """
+
+    window = xbmcgui.Window(_HOME_WINDOW_ID)
+    video_id = window.getProperty(_PROP_VIDEO_ID)
+    video_url = window.getProperty(_PROP_VIDEO_URL)
+    start_time = window.getProperty(_PROP_START_TIME)
+    registered_at = window.getProperty(_PROP_REGISTERED_AT)
+
+    window.clearProperty(_PROP_VIDEO_ID)
+    window.clearProperty(_PROP_VIDEO_URL)
+    window.clearProperty(_PROP_START_TIME)
+    window.clearProperty(_PROP_REGISTERED_AT)
+
+    try:
+        if not video_id or time.time() - int(registered_at) > _HANDOFF_TTL:
+            return None, None, 0
+        return video_id, video_url, int(start_time or 0)
+    except ValueError:
+        return None, None, 0
+
+class ProgressMonitor(xbmc.Player):
+    """
+    Progress monitor class to track video playback progress and send updates to the server.
+
+    Runs in the addon service. Updates are driven by player callbacks (start, seek,
+    pause, stop, end) plus a coarse heartbeat from tick() while playing. Positions
+    are queued in the progress outbox and sent by the flusher thread, so playback
+    callbacks never wait for the HTTP request.
+
+    Note: This class extends the xbmc.Player class to receive playback callbacks.
+    """
+
+    def __init__(self, outbox, flusher):
+        super().__init__()
+        self.outbox = outbox
+        self.flusher = flusher
+        self.video_id = None
+        self.video_url = None
+        self.position = 0
+        self.total_time = 0
+        self.last_report = 0
+        log("ProgressMonitor initialized", xbmc.LOGINFO)
+
+    @property
+    def tracking(self):
+        return self.video_id is not None
+
+    def wait_interval(self):
+        """
+        Get how long the service loop should sleep before the next tick.
+
+        Returns:
+            int: Seconds to wait
+        """
+
+        return SAMPLE_INTERVAL if self.tracking else IDLE_INTERVAL
+
+    def onAVStarted(self):
+        video_id, video_url, start_time = _take_playback()
+        if not video_id:
+            # Not our video (or started by something else), stop tracking the previous one
+            if self.tracking:
+                self._finish()
+            return
+
+        if self.tracking and video_id != self.video_id:
+            self._finish()
+
+        self.video_id = video_id
+        self.video_url = video_url
+        self.position = 0
+        self.last_report = 0
+        try:
+            self.total_time = self.getTotalTime()
+        except Exception:
+            self.total_time = 0
+        log(f"Tracking progress for video {video_id}", xbmc.LOGINFO)
+
+        if start_time > 0:
+            log(f"Seeking to initial position: {start_time}", xbmc.LOGINFO)
+            self.seekTime(start_time)
+            self.position = start_time
+        else:
+            self._sample()
+
+        self._report()
+
+    def onPlayBackSeek(self, time_ms, seek_offset):
+        if not self.tracking:
+            return
+        self.position = max(0, int(time_ms / 1000))
+        self._report()
+
+    def onPlayBackPaused(self):
+        if not self.tracking:
+            return
+        self._sample()
+        self._report()
+
+    def onPlayBackResumed(self):
+        if not self.tracking:
+            return
+        # Don't count the pause as watched time
+        self.last_report = time.time()
+
+    def onPlayBackStopped(self):
+        self._finish()
+
+    def onPlayBackEnded(self):
+        if self.tracking and self.total_time:
+            self.position = int(self.total_time)
+        self._finish()
+
+    def onPlayBackError(self):
+        self._finish()
+
+    def tick(self):
+        """
+        Sample the playback position and send a heartbeat update when due.
+        Called periodically from the service loop.
+        """
+
+        if not self.tracking:
+            return
+
+        if not self._sample():
+            return
+
+        if time.time() - self.last_report >= HEARTBEAT_INTERVAL:
+            self._report()
+
+    def shutdown(self):
+        """
+        Send the final position when the service is shutting down.
+        """
+
+        self._finish()
+
+    def _sample(self):
+        # Remember the current position, returns False when nothing is playing
+        try:
+            if not self.isPlayingVideo():
+                return False
+            current_time = self.getTime()
+        except Exception:
+            return False
+
+        if current_time > 0:
+            self.position = int(current_time)
+        return True
+
+    def _finish(self):
+        # Send the last known position and stop tracking
+        if not self.tracking:
+            return
+
+        log(f"Playback of video {self.video_id} finished at {self.position}s", xbmc.LOGINFO)
+        self._report()
+        self.video_id = None
+        self.video_url = None
+        self.position = 0
+        self.total_time = 0
+        self.last_report = 0
+
+    def _report(self):
+        # Queue the current position for sending to the server
+        if not self.tracking or self.position <= 0:
+            return
+
+        now = time.time()
+        spent = int(now - self.last_report) if self.last_report else SAMPLE_INTERVAL
+        spent = max(1, min(spent, HEARTBEAT_INTERVAL))
+        self.last_report = now
+
+        log("Queueing progress update for video %s at position %d", xbmc.LOGDEBUG, self.video_id, self.position)
+        self.outbox.put(self.video_id, self.position, spent, now)
+        self.flusher.wake()
+
+        # Keep the cached web position in sync, so "continue watching" shows it right away
+        if self.video_url:
+            try:
+                update_resume_position(self.video_url, self.position)
+            except Exception as e:
+                log(f"Error updating cached resume position: {str(e)}", xbmc.LOGWARNING)
@@ -1,12 +1,18 @@
 import xbmc
 import xbmcgui
 import xbmcplugin
-from urllib.parse import quote
-from bs4 import BeautifulSoup
-from .auth import require_session
+from urllib.parse import quote, urlparse, parse_qs
+from .auth import get_session, require_session
+from .cache import get_cached_video_details, update_video_details
+from .catalogue import extract_video_record
 from .constants import _HANDLE
-from .menu import process_video_item
-from .utils import get_url, log
+from .engine import fetch_details
+from .menu import process_video_item, create_video_list_item
+from .metrics import parse_html
+from .prefetch import get_page
+from .searchindex import search_local
+from .settings import get_settings
+from .utils import get_url, log, clean_url
 
 def search():
     """
@@ -33,6 +39,10 @@ def list_search_results(search_url):
     """
     Lists the search results from the given search URL
 
+    Videos already known to the addon are found in the local search index first
+    (instantly, without network requests), then the results from the web search
+    are added unless they were already found locally.
+
     Args:
         search_url (str): The URL to search for videos
 
@@ -40,49 +50,103 @@ def list_search_results(search_url):
         https://www.talktv.cz/hledani?q=terminator
     """
 
-    # Get a session for making HTTP requests
-    session = require_session()
-    if not session:
+    query = parse_qs(urlparse(search_url).query).get('q', [''])[0]
+    items = []
+    seen_urls = set()
+
+    # Local results first
+    if get_settings().local_search and query:
+        for row in search_local(query):
+            list_item = create_video_list_item(row['url'], row['title'], row['creator'], row['thumb'],
+                                               row['duration'], row['description'], row['date'])
+            items.append((get_url(action='play', video_url=row['url'], search_url=search_url), list_item))
+            seen_urls.add(row['url'])
+        log(f"Found {len(items)} local search results for: {query}", xbmc.LOGINFO)
+
+    if get_settings().search_web:
+        # Get a session for making HTTP requests
+        session = require_session() if not items else get_session()
+        if session:
+            items.extend(_search_web(session, search_url, seen_urls))
+        elif not items:
+            xbmcplugin.endOfDirectory(_HANDLE, succeeded=False)
+            return
+
+    if not items:
+        xbmcgui.Dialog().notification('Hledání', 'Žádné výsledky nenalezeny')
         xbmcplugin.endOfDirectory(_HANDLE, succeeded=False)
         return
 
+    xbmcplugin.addDirectoryItems(_HANDLE, [(url, list_item, False) for url, list_item in items], len(items))
+
+    # Set the plugin category and content type
+    xbmcplugin.setPluginCategory(_HANDLE, 'Výsledky hledání')
+    xbmcplugin.setContent(_HANDLE, 'videos')
+    xbmcplugin.endOfDirectory(_HANDLE)
+
+def _search_web(session, search_url, seen_urls):
+    """
+    Get search results from the web search
+
+    Args:
+        session (requests.Session): The session for making HTTP requests
+        search_url (str): The URL to search for videos
+        seen_urls (set): URLs of videos already listed (skipped)
+
+    Returns:
+        list: Tuples of (plugin URL, ListItem)
+    """
+
+    items = []
     try:
         log(f"Searching with URL: {search_url}", xbmc.LOGINFO)
-        # Make the HTTP GET request
-        response = session.get(search_url)
-        if response.status_code != 200:
-            log(f"Search request failed: {response.status_code}", xbmc.LOGERROR)
-            return
+        # Results change as videos are published, the stored copy is only for outages
+        content = get_page(session, search_url, fresh=True)
+        if content is None:
+            return items
 
         # Parse the HTML response
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(content, 'search')
         # Find the container with search results
         results_container = soup.find('div', id='mainSearchListContainer')
         if not results_container:
             log("No search results container found", xbmc.LOGWARNING)
-            xbmcgui.Dialog().notification('Hledání', 'Žádné výsledky nenalezeny')
-            return
+            return items
 
         # Find all video items in the results container
         video_items = results_container.find_all('a', class_='media')
         if not video_items:
             log("No search results found", xbmc.LOGINFO)
-            xbmcgui.Dialog().notification('Hledání', 'Žádné výsledky nenalezeny')
-            return
+            return items
+
+        video_items = [item for item in video_items
+                       if not (item.get('href') and clean_url('https://www.talktv.cz' + item['href']) in seen_urls)]
+
+        # Download the details of all results at once instead of one after another
+        video_urls = [record.url for record in map(extract_video_record, video_items) if record]
+        details = get_cached_video_details(video_urls)
+        fetched = {}
 
-        for item in video_items:
-            # Process video item with creator names
-            result = process_video_item(item, session)
-            if result:
-                list_item, video_url = result
-                url = get_url(action='play', video_url=video_url, search_url=search_url)
-                xbmcplugin.addDirectoryItem(_HANDLE, url, list_item, isFolder=False)
+        with fetch_details(session, [video_url for video_url in video_urls if video_url not in details]) as futures:
+            for item in video_items:
+                video_url = clean_url('https://www.talktv.cz' + item['href']) if item.get('href') else None
+                if video_url in futures:
+                    fetched[video_url] = futures[video_url].result()
 
-        # Set the plugin category and content type
-        xbmcplugin.setPluginCategory(_HANDLE, 'Výsledky hledání')
-        xbmcplugin.setContent(_HANDLE, 'videos')
-        xbmcplugin.endOfDirectory(_HANDLE)
+                # Process video item with creator names
+                result = process_video_item(item, session, details=fetched.get(video_url) or details.get(video_url))
+                if result:
+                    list_item, video_url = result
+                    url = get_url(action='play', video_url=video_url, search_url=search_url)
+                    items.append((url, list_item))
+                    seen_urls.add(video_url)
+
+        soup.decompose()
+        if fetched and get_settings().use_cache:
+            update_video_details(fetched)
 
     except Exception as e:
         log(f"Error in list_search_results: {str(e)}", xbmc.LOGERROR)
-        xbmcgui.Dialog().notification('Chyba', 'Chyba při vyhledávání')
\ No newline at end of file
+        xbmcgui.Dialog().notification('Chyba', 'Chyba při vyhledávání')
+
+    return items
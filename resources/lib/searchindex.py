@@ -0,0 +1,142 @@
+import re
+import time
+import unicodedata
+import xbmc
+from .db import connect, has_fts
+from .utils import log, parse_date
+
+# Videos seen during this invocation, written to the database at once by flush_videos()
+_pending = {}
+
+def normalize_text(text):
+    """
+    Normalize text for diacritic-insensitive matching
+
+    Args:
+        text (str): Text to normalize
+
+    Returns:
+        str: Lowercase text without diacritics
+
+    Example:
+        normalize_text('Jadrná Věda') -> 'jadrna veda'
+    """
+
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+def remember_video(video_url, **fields):
+    """
+    Remember metadata of a video for the local search index.
+
+    Args:
+        video_url (str): URL of the video
+        **fields: Any of title, creator, thumb, duration, description, date
+    """
+
+    record = _pending.setdefault(video_url, {})
+    record.update({key: value for key, value in fields.items() if value})
+
+def flush_videos():
+    """
+    Write the videos remembered during this invocation to the database.
+    """
+
+    if not _pending:
+        return
+
+    records = list(_pending.items())
+    _pending.clear()
+
+    try:
+        conn = connect()
+        try:
+            with conn:
+                now = time.time()
+                for video_url, record in records:
+                    upsert_video(conn, video_url, record, now)
+        finally:
+            conn.close()
+        log(f"Indexed {len(records)} videos", xbmc.LOGDEBUG)
+    except Exception as e:
+        log(f"Error updating search index: {str(e)}", xbmc.LOGWARNING)
+
+def upsert_video(conn, video_url, record, now):
+    """
+    Insert or update a video, merging the new fields with what is already known.
+
+    Args:
+        conn (sqlite3.Connection): Database connection (inside a transaction)
+        video_url (str): URL of the video
+        record (dict): Columns of the videos table to set
+        now (float): Update timestamp
+
+    Returns:
+        bool: True if anything changed
+    """
+
+    row = conn.execute('SELECT * FROM videos WHERE url = ?', (video_url,)).fetchone()
+    merged = dict(row) if row else {'url': video_url}
+    changed = row is None
+    for key, value in record.items():
+        if merged.get(key) != value:
+            merged[key] = value
+            changed = True
+
+    if not changed:
+        return False
+
+    merged['premiered'] = parse_date(merged.get('date', ''))
+    merged['search_text'] = normalize_text(' '.join(
+        merged.get(key, '') for key in ('title', 'creator', 'description')))
+    merged['updated'] = now
+
+    columns = [column for column in merged if column != 'rowid']
+    values = [merged[column] for column in columns]
+    conn.execute(
+        f'''INSERT INTO videos ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})
+            ON CONFLICT(url) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in columns[1:])}''',
+        values)
+    return True
+
+def search_local(query, limit=50):
+    """
+    Search the videos seen by the addon, ignoring case and diacritics.
+
+    Args:
+        query (str): Search string entered by the user
+        limit (int): Maximum number of results
+
+    Returns:
+        list: sqlite3.Row records of matching videos, best matches first
+
+    Example:
+        search_local('jadrna veda') matches 'JADRNÁ VĚDA'
+    """
+
+    tokens = re.findall(r'\w+', normalize_text(query))
+    if not tokens:
+        return []
+
+    try:
+        conn = connect()
+        try:
+            if has_fts(conn):
+                match = ' AND '.join(f'"{token}"*' for token in tokens)
+                return conn.execute(
+                    '''SELECT videos.* FROM videos_fts JOIN videos ON videos.rowid = videos_fts.rowid
+                       WHERE videos_fts MATCH ? ORDER BY bm25(videos_fts), videos.premiered DESC LIMIT ?''',
+                    (match, limit)).fetchall()
+
+            # Without FTS5 fall back to substring matching on the normalized text
+            where = ' AND '.join('search_text LIKE ?' for _ in tokens)
+            return conn.execute(
+                f'SELECT * FROM videos WHERE {where} ORDER BY premiered DESC LIMIT ?',
+                [f'%{token}%' for token in tokens] + [limit]).fetchall()
+        finally:
+            conn.close()
+    except Exception as e:
+        log(f"Error searching local index: {str(e)}", xbmc.LOGWARNING)
+        return []
@@ -0,0 +1,106 @@
+import threading
+import xbmc
+from .auth import get_session
+from .catalogue import sync_catalogue, is_catalogue_complete
+from .monitor import start_monitor, stop_monitor
+from .network import background
+from .outbox import ProgressOutbox, ProgressFlusher
+from .prefetch import invalidate_listings
+from .progress import ProgressMonitor
+from .settings import SettingsMonitor, get_settings
+from .utils import log
+
+# Catalogue sync schedule (seconds): first run after Kodi settles, faster while backfilling
+_SYNC_START_DELAY = 60
+_SYNC_INTERVAL = 3600
+_SYNC_BACKFILL_INTERVAL = 600
+
+# Set when the TALKNEWS monitor finds new items, a video may have been published with them
+_sync_requested = threading.Event()
+
+def _wait_for_sync(kodi_monitor, interval):
+    # Returns True when Kodi is shutting down, a sync request cuts the wait short
+    waited = 0
+    while waited < interval:
+        if kodi_monitor.waitForAbort(5):
+            return True
+        waited += 5
+        if _sync_requested.is_set():
+            _sync_requested.clear()
+            log("Catalogue sync requested by the TALKNEWS monitor", xbmc.LOGDEBUG)
+            break
+    return False
+
+def _catalogue_sync_loop(kodi_monitor):
+    """
+    Periodically sync the local video catalogue with TALK.cz, and sooner when the
+    TALKNEWS monitor finds new items. New videos invalidate the cached listings.
+
+    Args:
+        kodi_monitor (xbmc.Monitor): Monitor used to wait and to detect Kodi shutdown
+    """
+
+    if kodi_monitor.waitForAbort(_SYNC_START_DELAY):
+        return
+
+    while True:
+        interval = _SYNC_INTERVAL
+        try:
+            if get_settings().use_catalogue:
+                with background():
+                    session = get_session()
+                    if session:
+                        new_records = sync_catalogue(session)
+                        if new_records:
+                            invalidate_listings(session, new_records)
+                        if not is_catalogue_complete():
+                            interval = _SYNC_BACKFILL_INTERVAL
+        except Exception as e:
+            log(f"Error syncing catalogue: {str(e)}", xbmc.LOGWARNING)
+
+        if _wait_for_sync(kodi_monitor, interval):
+            return
+
+def run():
+    """
+    Main loop of the addon service.
+
+    Hosts the progress monitor, which receives player callbacks for the whole
+    Kodi session, and wakes up periodically to sample the playback position.
+    Positions are sent by the outbox flusher thread, which also delivers updates
+    left over from a previous Kodi session. A background thread keeps the local
+    catalogue in sync, the TALKNEWS monitor runs here while it is enabled.
+    """
+
+    kodi_monitor = SettingsMonitor()
+    outbox = ProgressOutbox()
+    flusher = ProgressFlusher(outbox)
+    flusher.start()
+    flusher.wake()
+
+    sync_thread = threading.Thread(target=_catalogue_sync_loop, args=(kodi_monitor,))
+    sync_thread.daemon = True
+    sync_thread.start()
+
+    player = ProgressMonitor(outbox, flusher)
+    log("TALK service started", xbmc.LOGINFO)
+
+    while not kodi_monitor.abortRequested():
+        try:
+            # Also starts the monitor again after it was enabled in the settings
+            start_monitor(on_new_items=lambda items: _sync_requested.set())
+        except Exception as e:
+            log(f"Failed to start TALKNEWS monitor: {str(e)}", xbmc.LOGERROR)
+
+        if kodi_monitor.waitForAbort(player.wait_interval()):
+            break
+
+        try:
+            player.tick()
+        except Exception as e:
+            log(f"Error in progress monitoring: {str(e)}", xbmc.LOGWARNING)
+
+    player.shutdown()
+    flusher.stop()
+    stop_monitor()
+    log("TALK service stopped", xbmc.LOGINFO)
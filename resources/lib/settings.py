@@ -0,0 +1,90 @@
+from typing import NamedTuple
+import xbmc
+import xbmcaddon
+from .constants import ADDON_ID
+
+class Settings(NamedTuple):
+    """
+    Snapshot of the addon settings with proper types.
+    """
+
+    session_cookie: str
+    enable_config_page: bool
+    config_port: int
+    preferred_stream: int  # 0=HLS, 1=MP4
+    video_quality: int  # index into the MP4 qualities, 0 is the best
+    skip_yt_time: int  # minutes
+    monitor_talknews: bool
+    check_interval: int  # index into the TALKNEWS check intervals
+    local_search: bool
+    search_web: bool
+    use_catalogue: bool
+    use_cache: bool
+    cache_artwork: bool
+    debug: bool
+    metrics_file: bool
+
+# Fallbacks for values that are missing or not valid, same as the defaults in settings.xml
+_INT_DEFAULTS = {
+    'config_port': 47447,
+    'preferred_stream': 0,
+    'video_quality': 0,
+    'skip_yt_time': 22,
+    'check_interval': 2
+}
+
+# Snapshot of the current process, read on first use
+_snapshot = None
+
+def _read():
+    # A new Addon instance, long-lived instances may keep returning the old values
+    addon = xbmcaddon.Addon(ADDON_ID)
+    values = {}
+    for name, field_type in Settings.__annotations__.items():
+        value = addon.getSetting(name)
+        if field_type is bool:
+            values[name] = value == 'true'
+        elif field_type is int:
+            try:
+                values[name] = int(value)
+            except ValueError:
+                values[name] = _INT_DEFAULTS[name]
+        else:
+            values[name] = value
+    return Settings(**values)
+
+def get_settings():
+    """
+    Get the settings snapshot of this process.
+
+    Plugin invocations read the settings once. Long-running code gets fresh
+    values after a change through SettingsMonitor.
+
+    Returns:
+        Settings: Current settings
+
+    Example:
+        if get_settings().use_cache:
+            ...
+    """
+
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = _read()
+    return _snapshot
+
+def refresh_settings():
+    """
+    Drop the settings snapshot, the next get_settings() reads the settings again.
+    """
+
+    global _snapshot
+    _snapshot = None
+
+class SettingsMonitor(xbmc.Monitor):
+    """
+    Kodi monitor that refreshes the settings snapshot when the settings change.
+    """
+
+    def onSettingsChanged(self):
+        refresh_settings()
@@ -1,9 +1,10 @@
 import xbmc
 import xbmcgui
 import xbmcplugin
-from bs4 import BeautifulSoup
+from .artwork import get_artwork
 from .auth import require_session
 from .constants import _HANDLE
+from .metrics import parse_html
 from .utils import log, get_url, clean_text
 
 def list_talknews():
@@ -30,11 +31,12 @@ def list_talknews():
             log(f"Failed to fetch TALKNEWS page: {response.status_code}", xbmc.LOGERROR)
             return
 
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text, 'talknews')
 
         # Find both div and a tags with embed__item class
         news_items = soup.find_all(['div', 'a'], class_='embed__item')
 
+        items = []
         for item in news_items:
             # Get meta text if exists
             meta = item.find('div', class_='embed__meta')
@@ -71,7 +73,7 @@ def list_talknews():
             # Set thumbnail image
             img_elem = item.find('img')
             if img_elem and img_elem.get('src'):
-                thumbnail = img_elem['src']
+                thumbnail = get_artwork(img_elem['src'])
                 list_item.setArt({
                     'thumb': thumbnail,
                     'icon': thumbnail
@@ -92,12 +94,18 @@ def list_talknews():
                             meta=meta_text)
                 is_folder = False
 
-            xbmcplugin.addDirectoryItem(_HANDLE, url, list_item, is_folder)
+            items.append((url, list_item, is_folder))
+
+        soup.decompose()
+
+        # Add all directory items to the Kodi plugin at once
+        xbmcplugin.addDirectoryItems(_HANDLE, items, len(items))
 
         # Set plugin category and content type
+        # Not cached, the headlines change during the day
         xbmcplugin.setPluginCategory(_HANDLE, 'TALKNEWS')
         xbmcplugin.setContent(_HANDLE, 'files')
-        xbmcplugin.endOfDirectory(_HANDLE)
+        xbmcplugin.endOfDirectory(_HANDLE, cacheToDisc=False)
 
     except Exception as e:
         log(f"Error in list_talknews: {str(e)}", xbmc.LOGERROR)
@@ -123,7 +131,7 @@ def show_article(article_url):
             log(f"Failed to fetch article: {response.status_code}", xbmc.LOGERROR)
             return
 
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text, 'article')
 
         content_div = soup.find('div', class_='post__content')
         if not content_div:
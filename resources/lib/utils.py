@@ -1,62 +1,84 @@
+import os
 import sys
 import traceback
+from functools import lru_cache
 from urllib.parse import urlencode
 import xbmc
 from .constants import _URL, _ADDON, ADDON_ID, MENU_CATEGORIES, CREATOR_CATEGORIES, ARCHIVE_CATEGORIES
+from .settings import get_settings
 
-def log(msg, level=xbmc.LOGDEBUG):
+def log(msg, level=xbmc.LOGDEBUG, *args):
     """
     Log message to Kodi log file with proper formatting and debug control.
 
+    Debug and info messages are only logged with debug logging enabled. The
+    message is formatted only when it is actually logged, so pass the values
+    as args (or a callable) in hot paths instead of building an f-string.
+
     Args:
-        msg (str): Message to log
+        msg (str or callable): Message to log, with %-style placeholders for args,
+            or a callable returning the message
         level (int): Log level (default: xbmc.LOGDEBUG)
+        *args: Values for the placeholders in msg
 
     Example:
-        log('This is a debug message', xbmc.LOGDEBUG)
         log('This is an error message', xbmc.LOGERROR)
+        log('Found %d videos on page %d', xbmc.LOGDEBUG, len(videos), page)
+        log(lambda: f'Cast: {describe_cast(cast)}', xbmc.LOGDEBUG)
     """
 
-    if (level in [xbmc.LOGERROR, xbmc.LOGWARNING] or
-        (_ADDON.getSetting('debug') == 'true')):
+    if level != xbmc.LOGERROR and level != xbmc.LOGWARNING and not get_settings().debug:
+        return
+
+    if callable(msg):
+        msg = msg()
+    elif args:
+        msg = msg % args
 
-        # Get the caller's frame info
-        frame = sys._getframe(1)
-        function_name = frame.f_code.co_name
+    # Format the message with the caller's function name
+    formatted_msg = f"{ADDON_ID}: [{sys._getframe(1).f_code.co_name}] {msg}"
 
-        # Format the message with function context
-        formatted_msg = f"{_ADDON.getAddonInfo('id')}: [{function_name}] {msg}"
+    # For errors, append the traceback if available
+    if level == xbmc.LOGERROR:
+        exc_type, exc_value, exc_tb = sys.exc_info()
+        if exc_type:
+            formatted_msg += f"\nTraceback:\n{''.join(traceback.format_exception(exc_type, exc_value, exc_tb))}"
 
-        # For errors, append the traceback if available
-        if level == xbmc.LOGERROR:
-            exc_type, exc_value, exc_tb = sys.exc_info()
-            if exc_type:
-                formatted_msg += f"\nTraceback:\n{''.join(traceback.format_exception(exc_type, exc_value, exc_tb))}"
+    xbmc.log(formatted_msg, level)
 
-        xbmc.log(formatted_msg, level)
 
+# Lookup tables compiled once from the category definitions
+_CREATORS_BY_COLORING = {creator['coloring']: creator for creator in CREATOR_CATEGORIES if creator.get('coloring')}
+_CREATORS_BY_NAME = {creator['name']: creator for creator in CREATOR_CATEGORIES}
+_CREATORS_BY_URL = {creator['url']: creator for creator in CREATOR_CATEGORIES}
+_CATEGORY_NAMES_BY_URL = {}
+for _category in MENU_CATEGORIES + CREATOR_CATEGORIES + ARCHIVE_CATEGORIES:
+    _CATEGORY_NAMES_BY_URL.setdefault(_category['url'], _category['name'])
 
+@lru_cache(maxsize=256)
 def get_category_name(url):
     """
-    Extract a meaningful category name from the URL or page content
+    Get the name of the category a URL belongs to, the longest matching
+    category URL wins (so filtered listings get their own name)
 
     Args:
-        url (str): URL to clean
+        url (str): URL of the listing, possibly with page or filter parameters
 
     Returns:
         str: Category name or 'Videa' if not found
 
     Example:
-        get_category_name('https://www.talktv.cz/posledni-videa?page=2') -> 'POSLEDNÍ VIDEA'
+        get_category_name('https://www.talktv.cz/videa?page=2') -> 'Poslední videa'
+        get_category_name('https://www.talktv.cz/videa?filter=ostatni&page=2') -> 'Ostatní'
         get_category_name('https://www.talktv.cz/standashow') -> 'STANDASHOW'
     """
 
-    # Go through all defined categories
-    all_categories = MENU_CATEGORIES + CREATOR_CATEGORIES + ARCHIVE_CATEGORIES
-    for category in all_categories:
-        if category['url'] in url:
-            log(f"category url: {category['url']}, category name: {category['name']}", xbmc.LOGINFO)
-            return category['name']
+    # The URL itself, then its prefixes ending before each separator, longest first
+    if url in _CATEGORY_NAMES_BY_URL:
+        return _CATEGORY_NAMES_BY_URL[url]
+    for i in range(len(url) - 1, 0, -1):
+        if url[i] in '?&/' and url[:i] in _CATEGORY_NAMES_BY_URL:
+            return _CATEGORY_NAMES_BY_URL[url[:i]]
 
     # If no category found, return 'Videa' as a fallback
     return 'Videa'
@@ -111,6 +133,32 @@ def get_image_path(image_name):
 
     return f'special://home/addons/{ADDON_ID}/resources/media/{image_name}'
 
+def get_profile_path(filename=None):
+    """
+    Get the addon profile directory (created if missing), or a file inside it
+
+    Args:
+        filename (str): Optional file name inside the profile directory
+
+    Returns:
+        str: Full path to the profile directory or the file
+    """
+
+    try:
+        # For Kodi 19+ use xbmcvfs.translatePath
+        import xbmcvfs
+        profile_path = xbmcvfs.translatePath(_ADDON.getAddonInfo('profile'))
+    except ImportError:
+        # Fallback for older Kodi versions
+        profile_path = xbmc.translatePath(_ADDON.getAddonInfo('profile'))
+
+    if not os.path.exists(profile_path):
+        os.makedirs(profile_path)
+
+    if filename:
+        return os.path.join(profile_path, filename)
+    return profile_path
+
 def clean_text(text):
     """
     Clean text from null characters and handle encoding
@@ -220,15 +268,8 @@ def get_creator_name_from_coloring(coloring_class):
         return ''
 
     # Extract number from coloring-X
-    try:
-        coloring_number = coloring_class.split('-')[1]
-        for creator in CREATOR_CATEGORIES:
-            if creator['coloring'] == coloring_number:
-                return creator['name']
-    except (IndexError, KeyError):
-        pass
-
-    return ''
+    creator = _CREATORS_BY_COLORING.get(coloring_class.partition('-')[2])
+    return creator['name'] if creator else ''
 
 def get_creator_cast(creator_name):
     """
@@ -236,44 +277,47 @@ def get_creator_cast(creator_name):
     Supports both string and dictionary format for cast members with optional images
     """
 
+    # Actors are built once per creator, the list is a copy callers may modify
+    return list(_get_creator_actors(creator_name)) if creator_name else []
+
+@lru_cache(maxsize=None)
+def _get_creator_actors(creator_name):
     cast_list = []
 
-    if not creator_name:
-        return cast_list
-
-    for creator in CREATOR_CATEGORIES:
-        if creator['name'] == creator_name:
-            # Create proper Actor objects
-            for i, actor_data in enumerate(creator.get('cast', [])):
-                try:
-                    # Handle both string and dictionary format
-                    if isinstance(actor_data, str):
-                        # Old format: just actor name as string
-                        actor_name = actor_data
-                        actor_image = ''
-                    elif isinstance(actor_data, dict):
-                        # New format: dictionary with name and optional image
-                        actor_name = actor_data.get('name', '')
-                        actor_image = actor_data.get('image', '')
-
-                        # Convert image filename to full path if provided
-                        if actor_image:
-                            actor_image = get_image_path(actor_image)
-                    else:
-                        log(f"Invalid cast data format: {actor_data}", xbmc.LOGWARNING)
-                        continue
-
-                    if not actor_name:
-                        continue
-
-                    # Create Actor object with name, role, order, and thumbnail
-                    actor = xbmc.Actor(actor_name, 'Moderátor', i, actor_image)
-                    cast_list.append(actor)
-                except Exception as e:
-                    log(f"Error creating actor {actor_data}: {str(e)}", xbmc.LOGERROR)
-            break
-
-    return cast_list
+    creator = _CREATORS_BY_NAME.get(creator_name)
+    if not creator:
+        return tuple(cast_list)
+
+    # Create proper Actor objects
+    for i, actor_data in enumerate(creator.get('cast', [])):
+        try:
+            # Handle both string and dictionary format
+            if isinstance(actor_data, str):
+                # Old format: just actor name as string
+                actor_name = actor_data
+                actor_image = ''
+            elif isinstance(actor_data, dict):
+                # New format: dictionary with name and optional image
+                actor_name = actor_data.get('name', '')
+                actor_image = actor_data.get('image', '')
+
+                # Convert image filename to full path if provided
+                if actor_image:
+                    actor_image = get_image_path(actor_image)
+            else:
+                log(f"Invalid cast data format: {actor_data}", xbmc.LOGWARNING)
+                continue
+
+            if not actor_name:
+                continue
+
+            # Create Actor object with name, role, order, and thumbnail
+            actor = xbmc.Actor(actor_name, 'Moderátor', i, actor_image)
+            cast_list.append(actor)
+        except Exception as e:
+            log(f"Error creating actor {actor_data}: {str(e)}", xbmc.LOGERROR)
+
+    return tuple(cast_list)
 
 def get_creator_url(creator_name):
     """
@@ -285,13 +329,26 @@ def get_creator_url(creator_name):
     Returns:
         str: URL of the creator's page or None if not found
     """
-    if not creator_name:
-        return None
 
-    for creator in CREATOR_CATEGORIES:
-        if creator['name'] == creator_name:
-            return creator['url']
-    return None
+    creator = _CREATORS_BY_NAME.get(creator_name) if creator_name else None
+    return creator['url'] if creator else None
+
+def get_creator_coloring(url):
+    """
+    Get the coloring number of the creator whose page a URL points to
+
+    Args:
+        url (str): URL without query parameters
+
+    Returns:
+        str: Coloring number or None if the URL is not a creator page
+
+    Example:
+        get_creator_coloring('https://www.talktv.cz/techguys') -> '6'
+    """
+
+    creator = _CREATORS_BY_URL.get(url)
+    return (creator.get('coloring') or None) if creator else None
 
 def get_ip():
     """
@@ -303,7 +360,7 @@ def get_ip():
     try:
         import xbmcgui
         import socket
-        port = int(_ADDON.getSetting('config_port'))
+        port = get_settings().config_port
 
         # Get all IP addresses
         ips = []
@@ -1,17 +1,19 @@
-import threading
-import time
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 import xbmc
 import xbmcgui
 import xbmcplugin
-from bs4 import BeautifulSoup
 from .auth import get_session, require_session
-from .constants import _HANDLE, _ADDON
+from .cache import RESUME_CACHE, RESUME_TTL, load_cache, edit_cache, parse_video_details, prune_resume_cache, update_video_details
+from .constants import _HANDLE
+from .metrics import parse_html, record_cache
+from .progress import register_playback
+from .settings import get_settings
 from .utils import get_url, log, get_image_path
 
-# Global progress monitor instance
-_progress_monitor = None
-_monitor_lock = threading.Lock()
+_RESUME_WORKERS = 4
+_RESUME_RE = re.compile(r'"ssVideoPos":(\d+)')
 
 def play_video(video_url, requested_quality=None, start_time=None):
     """
@@ -39,16 +41,16 @@ def play_video(video_url, requested_quality=None, start_time=None):
             return
 
         # Parse the HTML response
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text, 'video_page')
         video_element = soup.find('video-js')
         if not video_element:
             log("Video player element not found in page", xbmc.LOGERROR)
             return
 
         # Get stream type and quality preferences
-        prefer_hls = int(_ADDON.getSetting('preferred_stream')) == 0  # 0=HLS, 1=MP4
+        prefer_hls = get_settings().preferred_stream == 0  # 0=HLS, 1=MP4
         if not requested_quality:
-            quality_index = int(_ADDON.getSetting('video_quality'))
+            quality_index = get_settings().video_quality
             qualities = ['Auto', '1080p', '720p', '480p', '360p', '240p']
             requested_quality = qualities[quality_index]
 
@@ -146,12 +148,6 @@ def play_video(video_url, requested_quality=None, start_time=None):
         except Exception as e:
             log(f"Failed to set video metadata: {str(e)}", xbmc.LOGWARNING)
 
-        # Handle start time if specified
-        if start_time:
-            monitor = get_progress_monitor()
-            monitor.initial_position = start_time
-            log(f"Setting initial position to {start_time}s", xbmc.LOGINFO)
-
         # Extract and store video ID
         #
         # Original JS code on the video page footer:
@@ -169,14 +165,16 @@ def play_video(video_url, requested_quality=None, start_time=None):
         #     "ssVideoPos":5899,
         #     "ssVideoTime":1735309692
         # });
+        #
+        # The ID is handed over to the addon service, which reports the playback
+        # position (and seeks to start_time if specified) once playback starts.
         try:
             scripts = soup.find_all('script')
             for script in scripts:
                 if script.string and 'initPlayerComponent' in script.string:
                     match = re.search(r'"videoId":(\d+)', script.string)
                     if match:
-                        monitor = get_progress_monitor()
-                        monitor.video_id = match.group(1)
+                        register_playback(match.group(1), video_url, start_time)
                         break
         except Exception as e:
             log(f"Error extracting video ID: {str(e)}", xbmc.LOGERROR)
@@ -217,7 +215,7 @@ def skip_yt_part(video_url):
 
     try:
         # Get the skip time from settings (in minutes)
-        skip_time = int(_ADDON.getSetting('skip_yt_time'))
+        skip_time = get_settings().skip_yt_time
 
         # Convert minutes to seconds for the seek parameter
         seek_time = skip_time * 60
@@ -332,7 +330,7 @@ def yt_vip_stream():
             return False
 
         # Parse the HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text, 'homepage')
 
         # Find VIP stream link
         # Looking for: body > div.container > main > a.hero.hero--secondary.hero--link
@@ -469,217 +467,80 @@ def check_web_resume(video_url):
         if not session:
             return None
 
-        response = session.get(video_url)
-        if response.status_code != 200:
-            return None
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        scripts = soup.find_all('script')
-        for script in scripts:
-            if script.string and 'initPlayerComponent' in script.string:
-                pos_match = re.search(r'"ssVideoPos":(\d+)', script.string)
-                if pos_match:
-                    return int(pos_match.group(1))
+        positions, _ = get_web_resume_positions(session, [video_url])
+        return positions.get(video_url)
     except Exception as e:
         log(f"Error checking web resume point: {str(e)}", xbmc.LOGERROR)
     return None
 
-def get_progress_monitor():
-    """
-    Get or create the progress monitor singleton instance.
-    """
-    global _progress_monitor
-    with _monitor_lock:
-        if _progress_monitor is None:
-            _progress_monitor = ProgressMonitor()
-            log("Created new ProgressMonitor instance", xbmc.LOGINFO)
-        return _progress_monitor
-
-def clear_progress_monitor():
-    """
-    Clear the global progress monitor instance after cleanup.
-    """
-    global _progress_monitor
-    with _monitor_lock:
-        if _progress_monitor is not None:
-            _progress_monitor.cleanup()
-            _progress_monitor = None
-            log("Cleared global ProgressMonitor instance", xbmc.LOGINFO)
-
-class ProgressMonitor(xbmc.Player):
+def get_web_resume_positions(session, video_urls):
     """
-    Progress monitor class to track video playback progress and send updates to the server.
+    Get web resume positions of several videos at once.
 
-    Note: This class extends the xbmc.Player class to inherit playback methods.
-    """
+    Positions are cached for a few minutes, missing ones are fetched concurrently.
+    The details parsed from the downloaded pages are returned as well (and refresh
+    the video details cache), so listing the same videos doesn't download them again.
 
-    def __init__(self):
-        super().__init__()
-        self._video_id = None
-        self.monitor = xbmc.Monitor()
-        self.session = None
-        self.stop_thread = False
-        self.progress_thread = None
-        self.initial_position = 0  # Add this new property
-        self._cleanup_called = False
-        log("ProgressMonitor initialized", xbmc.LOGINFO)
-
-    def __del__(self):
-        """Destructor to ensure cleanup when object is garbage collected"""
-        if not self._cleanup_called:
-            log("ProgressMonitor destructor called, cleaning up", xbmc.LOGINFO)
-            self.cleanup()
-
-    def __enter__(self):
-        """Context manager entry"""
-        return self
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        """Context manager exit - ensures cleanup"""
-        self.cleanup()
-        return False  # Don't suppress exceptions
-
-    @property
-    def video_id(self):
-        return self._video_id
-
-    @video_id.setter
-    def video_id(self, value):
-        self._video_id = value
-        if value:
-            log(f"Video ID set to: {value}", xbmc.LOGINFO)
-            self._start_monitoring()
-
-    def _start_monitoring(self):
-        # Start the monitoring thread.
+    Args:
+        session (requests.Session): Authenticated session
+        video_urls (list): URLs of the videos
 
-        try:
-            # Get a new session
-            self.session = get_session()
-            if not self.session:
-                log("Failed to get session for monitoring", xbmc.LOGERROR)
-                return
-
-            # Stop existing thread if running
-            if self.progress_thread and self.progress_thread.is_alive():
-                log("Stopping existing progress thread", xbmc.LOGINFO)
-                self.stop_thread = True
-                try:
-                    self.progress_thread.join(timeout=3.0)
-                    if self.progress_thread.is_alive():
-                        log("Previous thread did not stop within timeout", xbmc.LOGWARNING)
-                except Exception as e:
-                    log(f"Error stopping previous thread: {str(e)}", xbmc.LOGERROR)
-
-            # Start new monitoring thread
-            self.stop_thread = False
-            self.progress_thread = threading.Thread(target=self.monitor_progress)
-            self.progress_thread.daemon = True
-            self.progress_thread.start()
-            log(f"Started progress monitoring thread for video {self.video_id}", xbmc.LOGINFO)
-        except Exception as e:
-            log(f"Error starting monitoring: {str(e)}", xbmc.LOGERROR)
+    Returns:
+        tuple: (dict video URL -> resume position in seconds or None if there is none,
+            dict video URL -> (description, date) of the pages downloaded)
+    """
 
-    def cleanup(self):
-        """Clean up resources and stop monitoring with proper timeout protection"""
-        if self._cleanup_called:
-            return
+    resume_cache = load_cache(RESUME_CACHE)
+    now = time.time()
 
-        log("Cleanup called", xbmc.LOGINFO)
-        self._cleanup_called = True
+    positions = {}
+    missing = []
+    for video_url in video_urls:
+        cached = resume_cache.get(video_url)
+        if cached and now - cached[1] < RESUME_TTL:
+            positions[video_url] = cached[0]
+            record_cache('resume', True)
+        elif video_url not in missing:
+            missing.append(video_url)
+            record_cache('resume', False)
 
-        # Stop the monitoring thread
-        if self.progress_thread and self.progress_thread.is_alive():
-            log("Stopping progress monitoring thread", xbmc.LOGINFO)
-            self.stop_thread = True
+    if not missing:
+        return positions, {}
 
-            # Wait for thread to finish with timeout
-            try:
-                self.progress_thread.join(timeout=5.0)
-                if self.progress_thread.is_alive():
-                    log("Thread did not stop within timeout", xbmc.LOGWARNING)
-                else:
-                    log("Progress monitoring thread stopped successfully", xbmc.LOGINFO)
-            except Exception as e:
-                log(f"Error joining progress thread: {str(e)}", xbmc.LOGERROR)
-
-        # Close session if it exists
-        if self.session:
-            try:
-                self.session.close()
-                log("Session closed", xbmc.LOGDEBUG)
-            except Exception as e:
-                log(f"Error closing session: {str(e)}", xbmc.LOGWARNING)
-
-        # Reset all attributes
-        self._video_id = None
-        self.session = None
-        self.progress_thread = None
-        self.stop_thread = False
-        self.initial_position = 0
-
-        log("ProgressMonitor cleanup completed", xbmc.LOGINFO)
-
-    def monitor_progress(self):
-        """Monitor video progress and send updates to server with full exception protection"""
+    def fetch(video_url):
         try:
-            log("Starting progress monitoring loop", xbmc.LOGINFO)
-            self._monitor_progress_internal()
+            response = session.get(video_url, timeout=10)
+            if response.status_code != 200:
+                return video_url, None, None
+            pos_match = _RESUME_RE.search(response.text)
+            position = int(pos_match.group(1)) if pos_match else None
+            return video_url, position, parse_video_details(response.text)
         except Exception as e:
-            log(f"Critical error in progress monitoring: {str(e)}", xbmc.LOGERROR)
-        finally:
-            log("Progress monitoring thread ending", xbmc.LOGINFO)
-
-    def _monitor_progress_internal(self):
-
-        # Wait for playback to start
-        attempt = 0
-        while attempt < 10 and (not self.isPlaying() or not self.isPlayingVideo()):
-            xbmc.sleep(1000)
-            attempt += 1
-            log(f"Waiting for playback to start (attempt {attempt})", xbmc.LOGINFO)
-
-        # If we have an initial position and playback has started, seek to it
-        if self.initial_position > 0 and self.isPlaying() and self.isPlayingVideo():
-            log(f"Seeking to initial position: {self.initial_position}", xbmc.LOGINFO)
-            self.seekTime(self.initial_position)
-            xbmc.sleep(1000)  # Give time for seek to complete
-
-        while not self.monitor.abortRequested() and not self.stop_thread:
-            try:
-                if self.video_id and self.session and self.isPlaying() and self.isPlayingVideo():
-                    current_time = self.getTime()
-
-                    # Only send updates if we have a valid time
-                    if current_time > 0:
-                        # Send progress update to server
-                        log(f"Sending progress update for video {self.video_id} at position {int(current_time)}", xbmc.LOGINFO)
-                        response = self.session.get(
-                            'https://www.talktv.cz/srv/log-time',
-                            params={
-                                'vid': self.video_id,
-                                'p': int(current_time),
-                                't': int(time.time()),
-                                's': 30
-                            },
-                            timeout=10
-                        )
-
-                        if response.status_code == 200:
-                            log(f"Progress updated for video {self.video_id} at position {int(current_time)}", xbmc.LOGINFO)
-                        else:
-                            log(f"Failed to update progress: {response.status_code}", xbmc.LOGWARNING)
-                else:
-                    if not self.isPlaying() or not self.isPlayingVideo():
-                        xbmc.sleep(1000)  # Wait a bit before checking again
-                        continue
-            except Exception as e:
-                log(f"Error in progress monitoring: {str(e)}", xbmc.LOGWARNING)
-
-            # Wait for 30 seconds before next update
-            for _ in range(30):
-                if self.monitor.waitForAbort(1) or self.stop_thread or not self.isPlaying():
-                    return
-
-        log("Progress monitoring loop ended", xbmc.LOGINFO)
-        self.initial_position = 0
+            log(f"Error fetching web resume point for {video_url}: {str(e)}", xbmc.LOGWARNING)
+            return video_url, None, None
+
+    log("Fetching web resume positions for %d videos", xbmc.LOGDEBUG, len(missing))
+    details = {}
+    fetched = {}
+    with ThreadPoolExecutor(max_workers=_RESUME_WORKERS) as executor:
+        for video_url, position, video_details in executor.map(fetch, missing):
+            positions[video_url] = position
+            if video_details is None:
+                continue
+            fetched[video_url] = [position, now]
+            details[video_url] = video_details
+
+    # Reloaded, a position reported by the service meanwhile (see cache.update_resume_position)
+    # is newer than the one read from the web, it is kept
+    with edit_cache(RESUME_CACHE) as resume_cache:
+        prune_resume_cache(resume_cache, now)
+        for video_url, entry in fetched.items():
+            current = resume_cache.get(video_url)
+            if current and current[1] > now:
+                positions[video_url] = current[0]
+            else:
+                resume_cache[video_url] = entry
+    if get_settings().use_cache:
+        update_video_details(details)
+
+    return positions, details
@@ -3,12 +3,13 @@ import http.server
 import socket
 import socketserver
 import json
-import requests
 import threading
 import time
 import xbmc
 from urllib.parse import urlparse
 from .constants import _ADDON
+from .network import create_session
+from .settings import get_settings, refresh_settings
 from .utils import log
 
 
@@ -30,7 +31,7 @@ class ConfigHandler(http.server.SimpleHTTPRequestHandler):
             self.end_headers()
 
             # Get current session cookie
-            current_cookie = _ADDON.getSetting('session_cookie')
+            current_cookie = get_settings().session_cookie
 
             # Get the path to webconfig.html
             current_dir = os.path.dirname(__file__)
@@ -66,6 +67,7 @@ class ConfigHandler(http.server.SimpleHTTPRequestHandler):
 
             if 'cookie' in data:
                 _ADDON.setSetting('session_cookie', data['cookie'])
+                refresh_settings()
 
                 self.send_response(200)
                 self.send_header('Content-Type', 'application/json; charset=utf-8')
@@ -76,13 +78,11 @@ class ConfigHandler(http.server.SimpleHTTPRequestHandler):
         elif parsed_path.path == '/talk/test':
             log('Path matched /talk/test, processing request', xbmc.LOGINFO)
 
-            session = requests.Session()
+            session = create_session(get_settings().session_cookie)
             success = False
             message = 'Cookie není platné nebo je expirované'
 
             try:
-                session_cookie = _ADDON.getSetting('session_cookie')
-                session.cookies.set('PHPSESSID', session_cookie, domain='www.talktv.cz')
                 response = session.get('https://www.talktv.cz/videa')
 
                 if 'popup-account__header-email' in response.text:
@@ -124,10 +124,10 @@ def start_server():
     """
     global _server_instance
 
-    if not _ADDON.getSetting('enable_config_page') == 'true':
+    if not get_settings().enable_config_page:
         return
 
-    port = int(_ADDON.getSetting('config_port'))
+    port = get_settings().config_port
 
     try:
         # Create custom TCPServer class with better socket options
@@ -0,0 +1,10 @@
+from resources.lib.service import run
+
+if __name__ == '__main__':
+    """
+    Entry point for the addon service
+
+    Runs for the whole Kodi session and reports playback progress to TALK.cz
+    """
+
+    run()